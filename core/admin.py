@@ -4,12 +4,13 @@ from django.contrib.contenttypes.admin import GenericTabularInline
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from store.admin import ProductAdmin, ProductImageInLine
 from store.models import Product
+from storefront20.admin import PrefixSearchMixin
 from tags.models import TaggedItem
 from .models import User
 # Register your models here.
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(PrefixSearchMixin, BaseUserAdmin):
     add_fieldsets = (
         (
             None,
@@ -19,6 +20,9 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
+    # Prefix searches, backed by UPPER() indexes on PostgreSQL.
+    search_fields = ['username__istartswith', 'first_name__istartswith',
+                     'last_name__istartswith', 'email__istartswith']
      
 
 class TagInLine(GenericTabularInline):
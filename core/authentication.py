@@ -0,0 +1,118 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the user's id, customer id, staff flags and a token
+version. Authenticating a request only compares that version with the
+one held in the cache, and `request.user` is a `LazyUser` that loads
+`core.User` the first time a field outside the token is read.
+
+Bumping the version with `revoke_tokens(user_id)` invalidates every
+token issued to the user so far.
+"""
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from store.models import Customer
+from storefront20.versions import VersionCounters
+from .backends import get_cached_permissions
+
+VERSION_CLAIM = 'pv'
+
+_versions = VersionCounters('auth:token_version')
+
+
+def get_token_version(user_id):
+    return _versions.get(user_id)[0]
+
+
+def revoke_tokens(user_id):
+    _versions.bump(user_id)
+
+
+def add_claims(token, user):
+    token['customer_id'] = Customer.objects.filter(user_id=user.id)\
+        .values_list('id', flat=True).first()
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token[VERSION_CLAIM] = get_token_version(user.id)
+    return token
+
+
+def check_token_version(token):
+    if token[VERSION_CLAIM] != get_token_version(token[api_settings.USER_ID_CLAIM]):
+        raise InvalidToken('Token has been revoked.')
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    The authenticated user, built from the token claims. Reading the claims
+    costs nothing; anything else, including passing the user where a
+    `core.User` instance is expected, loads the row once, like Django's own
+    lazy `request.user`. Attributes set on it are set on the loaded row.
+    """
+    # Tokens are only issued to active users, and deactivating a user
+    # revokes their tokens.
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        user_id = token[api_settings.USER_ID_CLAIM]
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__.update(
+            token=token,
+            id=user_id,
+            pk=user_id,
+            customer_id=token['customer_id'],
+            is_staff=token['is_staff'],
+            is_superuser=token['is_superuser'])
+
+    @property
+    def user(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+    def __setattr__(self, name, value):
+        # Keep a claim read from the token in step with the row.
+        if name in self.__dict__ and name not in ('_wrapped', '_setupfunc'):
+            self.__dict__[name] = value
+        super().__setattr__(name, value)
+
+    def get_all_permissions(self, obj=None):
+        if obj is not None:
+            return self.user.get_all_permissions(obj)
+        # Read from the shared permission cache; the user is only loaded
+        # when their permissions are not cached.
+        return get_cached_permissions(self.id, lambda: self.user.get_all_permissions())
+
+    def has_perm(self, perm, obj=None):
+        return self.is_superuser or perm in self.get_all_permissions(obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, app_label):
+        return self.is_superuser or any(
+            perm.startswith(f'{app_label}.') for perm in self.get_all_permissions())
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return self.id == getattr(other, 'id', None)
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        # Tokens issued before the version claim existed still load the
+        # user from the database.
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        check_token_version(validated_token)
+        return LazyUser(validated_token)
@@ -0,0 +1,16 @@
+from django.db import migrations
+from storefront20.db.indexes import prefix_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        prefix_search_index('user_username_prefix_idx', 'core_user', 'username'),
+        prefix_search_index('user_email_prefix_idx', 'core_user', 'email'),
+        prefix_search_index('user_first_name_prefix_idx', 'core_user', 'first_name'),
+        prefix_search_index('user_last_name_prefix_idx', 'core_user', 'last_name'),
+    ]
@@ -6,3 +6,15 @@ from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
+
+    # Changing any of these revokes the user's tokens.
+    TOKEN_FIELDS = ['password', 'is_active', 'is_staff', 'is_superuser']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_token_state = instance.get_token_state()
+        return instance
+
+    def get_token_state(self):
+        return [self.__dict__.get(name) for name in self.TOKEN_FIELDS]
@@ -1,4 +1,7 @@
 from djoser.serializers import UserSerializer as BaseUserSerializer , UserCreateSerializer as BaseUserCreateSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer, TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.authentication import VERSION_CLAIM, add_claims, check_token_version
 
 from store import serializers
 
@@ -12,3 +15,19 @@ class UserSerializer(BaseUserSerializer):
 
     class Meta(BaseUserSerializer.Meta):
         fields = ['id',"username", "email", "first_name", "last_name"]
+
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # The claims are copied from the refresh token to its access tokens.
+        return add_claims(super().get_token(user), user)
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if VERSION_CLAIM in refresh:
+            check_token_version(refresh)
+        return super().validate(attrs)
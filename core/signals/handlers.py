@@ -1,6 +1,58 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from store.signals import order_created
 from django.dispatch import receiver
+from core.authentication import revoke_tokens
+from core.backends import invalidate_permissions
+
+User = get_user_model()
 
 @receiver(order_created)
 def on_order_created(sender, **kwargs):
     print(kwargs['order'])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_change(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_token_state', None)
+    state = instance.get_token_state()
+    if not created and loaded is not None and loaded != state:
+        revoke_tokens(instance.id)
+        # A superuser's cached permission set holds every permission.
+        invalidate_permissions(instance.id)
+    instance._loaded_token_state = state
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    # Tokens carry the staff flags, so they must not outlive the user.
+    revoke_tokens(instance.id)
+    invalidate_permissions(instance.id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Changed from the group or permission side, which may touch any
+        # number of users.
+        invalidate_permissions()
+    else:
+        invalidate_permissions(instance.pk)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_permissions()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_deleted_permissions(sender, **kwargs):
+    # Cascading deletes of the m2m rows do not send m2m_changed.
+    invalidate_permissions()
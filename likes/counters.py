@@ -0,0 +1,122 @@
+"""
+Write-behind like counters.
+
+A like or unlike only increments a per-object delta in the cache. The
+first delta of an object since the last flush also appends the object to
+a journal, so `flush()` knows which deltas to move into `LikeCounter`
+without scanning the cache. Many likes of a popular object between two
+flushes are coalesced into a single UPDATE.
+"""
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.db import transaction
+from .models import LikeCounter
+
+# A dirty flag whose journal entry was lost (evicted, or skipped by a
+# concurrent flush) expires, so the next like journals the object again.
+DIRTY_TIMEOUT = 60 * 60
+JOURNAL_TIMEOUT = 24 * 60 * 60
+FLUSH_LOCK_TIMEOUT = 5 * 60
+# Claims a journal slot that was allocated but not yet written when a
+# flush read it.
+SKIPPED = 'skipped'
+
+
+def _delta_key(content_type_id, object_id):
+    return f'likes:delta:{content_type_id}:{object_id}'
+
+
+def _dirty_key(content_type_id, object_id):
+    return f'likes:dirty:{content_type_id}:{object_id}'
+
+
+def _journal_key(position):
+    return f'likes:journal:{position}'
+
+
+def _incr(key, delta):
+    cache.add(key, 0, None)
+    return cache.incr(key, delta)
+
+
+def record(content_type_id, object_id, delta):
+    _incr(_delta_key(content_type_id, object_id), delta)
+    _mark_dirty(content_type_id, object_id)
+
+
+def _mark_dirty(content_type_id, object_id):
+    if cache.add(_dirty_key(content_type_id, object_id), True, DIRTY_TIMEOUT):
+        # The entry is add()ed to its slot: if a flush already claimed the
+        # slot as skipped, take the next one rather than be lost.
+        while not cache.add(_journal_key(_incr('likes:journal:end', 1)),
+                            (content_type_id, object_id), JOURNAL_TIMEOUT):
+            pass
+
+
+@contextmanager
+def flush_lock():
+    """Yields whether the lock was acquired; flushes must not overlap."""
+    acquired = cache.add('likes:flush:lock', True, FLUSH_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete('likes:flush:lock')
+
+
+def flush():
+    """Moves the pending deltas into LikeCounter. Returns the objects updated."""
+    with flush_lock() as acquired:
+        return _flush() if acquired else 0
+
+
+def reconcile():
+    """
+    Flushes, then recounts every counter from LikedItem. Returns the
+    counters updated, or None if a flush is running.
+    """
+    with flush_lock() as acquired:
+        if not acquired:
+            return None
+        _flush()
+        return LikeCounter.objects.reconcile()
+
+
+def _flush():
+    start = cache.get('likes:journal:start', 0)
+    end = cache.get('likes:journal:end', 0)
+    if end <= start:
+        return 0
+    journal_keys = [_journal_key(position) for position in range(start + 1, end + 1)]
+    entries = cache.get_many(journal_keys)
+    for key in journal_keys:
+        # An empty slot is allocated but not written yet (or evicted).
+        # Claiming it makes its writer move on to a slot after `end`.
+        if key not in entries and not cache.add(key, SKIPPED, JOURNAL_TIMEOUT):
+            entries[key] = cache.get(key)
+    objects = {entry for entry in entries.values() if entry not in (None, SKIPPED)}
+
+    # The dirty flag is cleared before the delta is taken, so a like that
+    # lands in between journals the object again rather than being lost.
+    cache.delete_many([_dirty_key(*obj) for obj in objects])
+    deltas = {}
+    for obj in objects:
+        key = _delta_key(*obj)
+        delta = cache.get(key)
+        if delta:
+            # decr() keeps the likes recorded since the get().
+            cache.decr(key, delta)
+            deltas[obj] = delta
+
+    try:
+        with transaction.atomic():
+            LikeCounter.objects.add_counts(deltas)
+    except Exception:
+        for obj, delta in deltas.items():
+            record(*obj, delta)
+        raise
+    cache.set('likes:journal:start', end, None)
+    # Skipped slots stay claimed until they expire, or a late writer
+    # could still take one that is behind `start`.
+    cache.delete_many([key for key, entry in entries.items() if entry != SKIPPED])
+    return len(deltas)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from likes import counters
+
+
+class Command(BaseCommand):
+    help = 'Flushes pending likes and recounts every like counter.'
+
+    def handle(self, *args, **options):
+        print('Reconciling like counters...')
+        updated_count = counters.reconcile()
+        if updated_count is None:
+            raise CommandError('A flush of the like counters is running, try again.')
+        print(f'{updated_count} counters were updated.')
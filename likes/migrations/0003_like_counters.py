@@ -0,0 +1,61 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:51
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+import django.db.models.deletion
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    LikedItem = apps.get_model('likes', 'LikedItem')
+    duplicates = LikedItem.objects.values('user', 'content_type', 'object_id')\
+        .annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        LikedItem.objects.filter(
+            user=duplicate['user'],
+            content_type=duplicate['content_type'],
+            object_id=duplicate['object_id']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+def create_counters(apps, schema_editor):
+    LikedItem = apps.get_model('likes', 'LikedItem')
+    LikeCounter = apps.get_model('likes', 'LikeCounter')
+    counts = LikedItem.objects.values('content_type', 'object_id').annotate(count=Count('id'))
+    LikeCounter.objects.bulk_create([
+        LikeCounter(content_type_id=row['content_type'], object_id=row['object_id'], count=row['count'])
+        for row in counts
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('likes', '0002_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='likeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='likeditem_unique_like'),
+        ),
+        migrations.AddField(
+            model_name='likecounter',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='likecounter',
+            unique_together={('content_type', 'object_id')},
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,104 @@
+from collections import defaultdict
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey 
 
 
 
 # Create your models here.
+class LikedItemManager(models.Manager):
+    def like_counts_for(self, obj_type, obj_ids):
+        """
+        Returns {object id: number of likes} for `obj_ids` in one query.
+        Counts are read from LikeCounter, so they lag behind until the
+        flush_like_counters task runs.
+        """
+        content_type = ContentType.objects.get_for_model(obj_type)
+        return dict(LikeCounter.objects.filter(
+                content_type=content_type,
+                object_id__in=obj_ids
+        ).values_list('object_id', 'count'))
+
+    def like(self, user, obj):
+        """Returns False if `user` already likes `obj`."""
+        try:
+            with transaction.atomic():
+                self.create(user=user, content_object=obj)
+        except IntegrityError:
+            return False
+        return True
+
+    def unlike(self, user, obj):
+        content_type = ContentType.objects.get_for_model(obj)
+        # Sends post_delete for each row, which updates the counter.
+        self.filter(user=user, content_type=content_type, object_id=obj.pk).delete()
+
 
 class LikedItem(models.Model):
+    objects = LikedItemManager()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete = models.CASCADE)
     content_type = models.ForeignKey(ContentType , on_delete = models.CASCADE)
     object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey()
\ No newline at end of file
+    content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='likeditem_object_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'], name='likeditem_unique_like'),
+        ]
+
+
+class LikeCounterQuerySet(models.QuerySet):
+    def add_counts(self, deltas):
+        """
+        Adds `deltas` ({(content type id, object id): delta}) with one F()
+        update per content type, then inserts the counters that are missing.
+        """
+        by_content_type = defaultdict(dict)
+        for (content_type_id, object_id), delta in deltas.items():
+            by_content_type[content_type_id][object_id] = delta
+        for content_type_id, object_deltas in by_content_type.items():
+            counters = self.filter(content_type_id=content_type_id, object_id__in=object_deltas)
+            counters.update(count=F('count') + Case(
+                *[When(object_id=object_id, then=Value(delta))
+                  for object_id, delta in object_deltas.items()],
+                output_field=models.IntegerField()))
+            existing = set(counters.values_list('object_id', flat=True))
+            self.bulk_create([
+                LikeCounter(content_type_id=content_type_id, object_id=object_id, count=delta)
+                for object_id, delta in object_deltas.items()
+                if object_id not in existing
+            ])
+
+    def reconcile(self):
+        """Recounts every counter from LikedItem, creating the missing ones."""
+        missing = LikedItem.objects.exclude(Exists(self.filter(
+                content_type=OuterRef('content_type'),
+                object_id=OuterRef('object_id')
+        ))).values_list('content_type_id', 'object_id').distinct()
+        self.bulk_create([
+            LikeCounter(content_type_id=content_type_id, object_id=object_id)
+            for content_type_id, object_id in missing
+        ], ignore_conflicts=True)
+        counts = LikedItem.objects.filter(
+                content_type=OuterRef('content_type'),
+                object_id=OuterRef('object_id')
+        ).order_by().values('object_id').annotate(count=Count('id')).values('count')
+        return self.update(count=Coalesce(Subquery(counts), Value(0)))
+
+
+class LikeCounter(models.Model):
+    content_type = models.ForeignKey(ContentType , on_delete = models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    objects = LikeCounterQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [['content_type', 'object_id']]
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import counters
+from .models import LikedItem
+
+
+@receiver(post_save, sender=LikedItem)
+def count_like(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: counters.record(instance.content_type_id, instance.object_id, 1), robust=True)
+
+
+@receiver(post_delete, sender=LikedItem)
+def count_unlike(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: counters.record(instance.content_type_id, instance.object_id, -1), robust=True)
@@ -0,0 +1,7 @@
+from celery import shared_task
+from . import counters
+
+
+@shared_task
+def flush_like_counters():
+    return counters.flush()
@@ -0,0 +1,41 @@
+from locust import HttpUser, task, between
+from random import randint
+from uuid import uuid4
+
+# Concurrency benchmark for checkout: every user keeps ordering one of a
+# handful of hot products, so all orders contend for the same product rows.
+# Seed generous inventory first, e.g.
+#   UPDATE store_product SET inventory = 1000000 WHERE id <= 5;
+# then run with many users, e.g. `locust -f locustfiles/place_orders.py -u 1000 -r 100`.
+
+class CheckoutUser(HttpUser):
+    wait_time = between(0, 1)
+
+    @task
+    def place_order(self):
+        response = self.client.post('/store/carts/', name='/store/carts')
+        cart_id = response.json()['id']
+        self.client.post(
+                f'/store/carts/{cart_id}/items/bulk/',
+                name='/store/carts/items/bulk',
+                json=[{'product_id': randint(1, 5), 'quantity': 1}
+                      for _ in range(3)])
+        self.client.post(
+                '/store/orders/',
+                name='/store/orders',
+                json={'cart_id': cart_id},
+                headers=self.headers)
+
+    def on_start(self):
+        username = f'bench-{uuid4().hex}'
+        password = uuid4().hex
+        self.client.post('/auth/users/', name='/auth/users', json={
+            'username': username,
+            'password': password,
+            'email': f'{username}@example.com',
+        })
+        response = self.client.post('/auth/jwt/create/', name='/auth/jwt/create', json={
+            'username': username,
+            'password': password,
+        })
+        self.headers = {'Authorization': f'JWT {response.json()["access"]}'}
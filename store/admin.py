@@ -1,11 +1,18 @@
 from tkinter.ttk import Style
+from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 from django.contrib.contenttypes.admin import GenericTabularInline
+from django.core.files.storage import default_storage
+from django.db.models import OuterRef, Subquery
 from django.db.models.aggregates import Count, Max, Min, Avg,Sum
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
+from storefront20.admin import PrefixSearchMixin
 from tags.models import TaggedItem
-from . import models
+from . import jobs, models
+from .pagination import EstimatedCountPaginator
 
 # Register your models here.
 class InventoryFilter(admin.SimpleListFilter):
@@ -21,29 +28,39 @@ class InventoryFilter(admin.SimpleListFilter):
         if self.value() == '<10':
             return queryset.filter(inventory__lt = 10)
 
+class ProductActionForm(ActionForm):
+    percent = forms.DecimalField(
+        required=False, max_digits=5, decimal_places=2, min_value=-99, max_value=1000,
+        label='Percent', help_text='For Adjust prices, e.g. 10 or -5.')
+
 class ProductImageInLine(admin.TabularInline):
     model = models.ProductImage
     readonly_fields = ['thumbnail']
 
     def thumbnail(self, instance):
+        if 'thumb' in instance.derivatives:
+            return format_html('<img src="{}" class="thumbnail" />', default_storage.url(instance.derivatives['thumb']))
         if instance.image.name != '':
             return format_html(f'<img src="{instance.image.url}" class="thumbnail" />')
         return ''
 
 #@admin.register(models.Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(PrefixSearchMixin, admin.ModelAdmin):
     autocomplete_fields = ['collection']
-    search_fields = ['title']
+    search_fields = ['title__istartswith']
     prepopulated_fields = {
         'slug' : ['title']
     }
-    actions = ['clear_inventory']
+    actions = ['clear_inventory', 'adjust_prices']
+    action_form = ProductActionForm
     inlines = [ProductImageInLine]
     list_display = ['title','unit_price','inventory_status','collection_title']
     list_editable = ['unit_price']
     list_filter = ['collection', 'last_update', InventoryFilter]
     list_per_page = 10
     list_select_related = ['collection']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
 
     def collection_title(slef, product):
@@ -57,12 +74,30 @@ class ProductAdmin(admin.ModelAdmin):
     
     @admin.action(description='Clear inventory')
     def clear_inventory(self, request, queryset):
-        updated_count = queryset.update(inventory=0)
-        self.message_user(
-            request,
-            f'{updated_count} products were successfully updated.',
-    
-        )
+        job = jobs.start_job(
+            'clear_inventory', queryset, 'Clear inventory', user=request.user)
+        self.message_job(request, job)
+
+    @admin.action(description='Adjust prices')
+    def adjust_prices(self, request, queryset):
+        # Only the percent matters here; the admin validated the action.
+        form = self.action_form(request.POST)
+        form.full_clean()
+        percent = form.cleaned_data.get('percent')
+        if percent is None:
+            self.message_user(request, 'Enter a valid percent to adjust prices by.', messages.ERROR)
+            return
+        job = jobs.start_job(
+            'adjust_prices', queryset,
+            f'Adjust prices by {percent}%',
+            params={'percent': str(percent)}, user=request.user)
+        self.message_job(request, job)
+
+    def message_job(self, request, job):
+        url = reverse('admin:store_adminjob_change', args=[job.id])
+        self.message_user(request, format_html(
+            '{} of {} products started in the background, follow its <a href="{}">progress</a>.',
+            job.description, job.total, url))
 
     class Media:
         css = {
@@ -71,14 +106,16 @@ class ProductAdmin(admin.ModelAdmin):
 
 
 #@admin.register(models.Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(PrefixSearchMixin, admin.ModelAdmin):
     autocomplete_fields = ['user']
     list_display = ['first_name','last_name','membership','orders']
     list_editable = ['membership']
     list_per_page = 10
     list_select_related = ['user']
     ordering = ['user__first_name','user__last_name']
-    search_fields = ['first_name__istartswith','last_name__istartswith']
+    search_fields = ['user__first_name__istartswith','user__last_name__istartswith']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
 
 
@@ -93,8 +130,13 @@ class CustomerAdmin(admin.ModelAdmin):
         return format_html ('<a href="{}"> {}</a>', url ,customer.orders_count)
     
     def get_queryset(self, request):
+        # A correlated subquery rather than a join with GROUP BY: it is only
+        # evaluated for the rows of the page, and the changelist count drops
+        # it altogether.
+        orders_count = models.Order.objects.filter(customer=OuterRef('pk'))\
+            .order_by().values('customer').annotate(count=Count('*')).values('count')
         return super().get_queryset(request).annotate(
-            orders_count=Count('order')
+            orders_count=Coalesce(Subquery(orders_count), 0)
         )
 
 
@@ -112,13 +154,16 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ['id','customer','placed_at','payment_status']
     list_editable = ['payment_status']
     ordering = ['id','customer']
-    list_select_related = ['customer']
+    # Customer.__str__ reads the user's name.
+    list_select_related = ['customer__user']
     list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 #@admin.register(models.Collection)
-class CollectionAdmin(admin.ModelAdmin):
+class CollectionAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = ['title','products_count']
-    search_fields = ['title']
+    search_fields = ['title__istartswith']
     
     @admin.display(ordering='products_count')
     def products_count(self, collection):
@@ -128,16 +173,40 @@ class CollectionAdmin(admin.ModelAdmin):
             + urlencode({
                 'collection__id' : str(collection.id)
             }))
-        return format_html('<a href="{}"> {} Products </a>', url ,collection.product_count)
-        
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(
-            products_count = Count('products')
-        )
+        return format_html('<a href="{}"> {} Products </a>', url ,collection.products_count)
+
+
+#@admin.register(models.AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = ['description', 'status', 'progress', 'updated', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'action']
+    list_select_related = ['created_by']
+    fields = ['description', 'status', 'progress', 'updated', 'error', 'created_by', 'created_at', 'finished_at']
+    readonly_fields = fields
+
+    @admin.display(ordering='processed')
+    def progress(self, job):
+        percent = job.processed * 100 // job.total if job.total else 100
+        return format_html(
+            '<progress value="{}" max="{}"></progress> {}/{} ({}%)',
+            job.processed, job.total or 1, job.processed, job.total, percent)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        response = super().change_view(request, object_id, form_url, extra_context)
+        # Reload the page while the job runs to update its progress.
+        job = self.get_object(request, object_id)
+        if job is not None and job.status in (models.AdminJob.STATUS_PENDING, models.AdminJob.STATUS_RUNNING):
+            response['Refresh'] = '2'
+        return response
 
 
+admin.site.register(models.AdminJob, AdminJobAdmin)
 admin.site.register(models.Collection, CollectionAdmin)
 admin.site.register(models.Order, OrderAdmin)
 admin.site.register(models.Product, ProductAdmin)
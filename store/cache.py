@@ -0,0 +1,117 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from storefront20.versions import VersionCounters
+
+# Version scopes:
+#   'catalog'         - bumped by bulk writes that bypass model signals
+#   'products'        - any product change (unfiltered product lists)
+#   'collection:<id>' - products or metadata of one collection changed
+#   'product:<id>'    - one product or its images changed
+#   'collections'     - any collection title or product count changed
+#   'cart:<id>'       - items of one cart changed
+CATALOG = 'catalog'
+PRODUCTS = 'products'
+COLLECTIONS = 'collections'
+
+
+def collection_scope(collection_id):
+    return f'collection:{collection_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def cart_scope(cart_id):
+    return f'cart:{str(cart_id).lower()}'
+
+
+_versions = VersionCounters('store:version')
+
+
+def get_versions(*scopes):
+    return _versions.get(*scopes)
+
+
+def bump(*scopes):
+    _versions.bump(*scopes)
+
+
+def bump_collections(collection_ids):
+    """Invalidates collections whose products_count was changed in bulk."""
+    bump(COLLECTIONS, *[collection_scope(collection_id) for collection_id in collection_ids])
+
+
+def bump_products(products):
+    """Invalidates products changed by a bulk update that skipped signals."""
+    scopes = {PRODUCTS}
+    for product in products:
+        scopes.add(product_scope(product.pk))
+        scopes.add(collection_scope(product.collection_id))
+    bump(*scopes)
+
+
+def _normalized_query(request, ignore=()):
+    params = sorted(
+        (name, values) for name, values in request.query_params.lists()
+        if name not in ignore)
+    return '&'.join(f'{name}={",".join(values)}' for name, values in params)
+
+
+def _make_key(prefix, request, versions, query=''):
+    # Responses embed absolute URLs (pagination links, images), so the
+    # scheme and host are part of the key.
+    digest = hashlib.md5(
+        f'{request.scheme}://{request.get_host()}?{query}'.encode()).hexdigest()
+    return f'store:{prefix}:{".".join(map(str, versions))}:{digest}'
+
+
+def product_list_scopes(request):
+    collection_ids = request.query_params.getlist('collection_id')
+    if len(collection_ids) == 1:
+        return (CATALOG, collection_scope(collection_ids[0]))
+    return (CATALOG, PRODUCTS)
+
+
+# Embedded after the cache, see store.embeds.
+PRODUCT_IGNORED_PARAMS = ('include',)
+
+
+def product_list_key(request):
+    versions = get_versions(*product_list_scopes(request))
+    return _make_key('products', request, versions,
+                     _normalized_query(request, PRODUCT_IGNORED_PARAMS))
+
+
+def product_detail_key(request, product_id):
+    versions = get_versions(CATALOG, product_scope(product_id))
+    return _make_key(f'product:{product_id}', request, versions,
+                     _normalized_query(request, PRODUCT_IGNORED_PARAMS))
+
+
+def collection_list_key(request):
+    versions = get_versions(COLLECTIONS)
+    return _make_key('collections', request, versions, _normalized_query(request))
+
+
+def collection_detail_key(request, collection_id):
+    versions = get_versions(collection_scope(collection_id))
+    return _make_key(f'collection:{collection_id}', request, versions,
+                     _normalized_query(request))
+
+
+def cart_key(request, cart_id, products_updated_at):
+    # Product titles and prices are embedded in the cart, so their last
+    # update is part of the key along with the cart's own version.
+    versions = get_versions(cart_scope(cart_id))
+    return _make_key(cart_scope(cart_id), request, versions,
+                     f'{products_updated_at}?{_normalized_query(request)}')
+
+
+def get_data(key):
+    return cache.get(key)
+
+
+def set_data(key, data):
+    cache.set(key, data, settings.STORE_RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,35 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+
+
+def make_etag(request, key):
+    # The renderer is part of the tag: JSON and the browsable API must not
+    # validate each other's cached copies.
+    digest = hashlib.md5(f'{key}:{request.accepted_renderer.format}'.encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Weak ETag support for GET handlers. The tag is derived from a cache key
+    built from version counters, so a matching If-None-Match is answered
+    with 304 before the queryset or serializer is touched.
+    """
+    def conditional_response(self, key, handler, *args, **kwargs):
+        request = self.request
+        etag = make_etag(request, key) if key else None
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                response['ETag'] = etag
+                return response
+
+        response = handler(*args, **kwargs)
+        if etag is None or response.status_code != status.HTTP_200_OK:
+            return response
+        response['ETag'] = etag
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=response)
@@ -0,0 +1,48 @@
+"""
+Resolves the customer of the authenticated user at most once per request.
+
+`CustomerMiddleware` sets `request.customer`, which is loaded on first
+use from a short-lived shared cache keyed by user id. Saving or deleting a
+customer drops the cached copy.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from .models import Customer
+
+# The fields CustomerSerializer reads.
+CUSTOMER_FIELDS = ['id', 'user', 'phone', 'birth_date', 'membership']
+
+
+def _customer_key(user_id):
+    return f'store:customer:{user_id}'
+
+
+def get_customer(user_id):
+    key = _customer_key(user_id)
+    customer = cache.get(key)
+    if customer is None:
+        customer = Customer.objects.only(*CUSTOMER_FIELDS).get(user_id=user_id)
+        cache.set(key, customer, settings.STORE_CUSTOMER_CACHE_TIMEOUT)
+    return customer
+
+
+def invalidate_customer(user_id):
+    cache.delete(_customer_key(user_id))
+
+
+def get_request_customer(request):
+    # DRF authenticates inside the view and copies the user onto the
+    # underlying HttpRequest, so this must not run before the view does.
+    if not request.user.is_authenticated:
+        return None
+    return get_customer(request.user.id)
+
+
+class CustomerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.customer = SimpleLazyObject(lambda: get_request_customer(request))
+        return self.get_response(request)
@@ -0,0 +1,42 @@
+"""
+Opt-in related data for product responses, requested with
+`?include=tags,likes`. Each include adds one query for the whole page,
+and runs after the response cache, so tags and likes are always fresh
+without invalidating cached products.
+"""
+from rest_framework.exceptions import ValidationError
+from likes.models import LikedItem
+from tags.models import TaggedItem
+from .models import Product
+
+
+def embed_tags(products):
+    tags = TaggedItem.objects.get_tags_for_many(Product, [product['id'] for product in products])
+    for product in products:
+        product['tags'] = [tag.label for tag in tags.get(product['id'], [])]
+
+
+def embed_likes_count(products):
+    counts = LikedItem.objects.like_counts_for(Product, [product['id'] for product in products])
+    for product in products:
+        product['likes_count'] = counts.get(product['id'], 0)
+
+
+INCLUDES = {
+    'tags': embed_tags,
+    'likes': embed_likes_count,
+}
+
+
+def get_includes(request):
+    includes = [name for name in request.query_params.get('include', '').split(',') if name]
+    unknown = set(includes) - set(INCLUDES)
+    if unknown:
+        raise ValidationError({'include': f'Must be a comma-separated list of: {", ".join(INCLUDES)}.'})
+    return includes
+
+
+def embed(products, includes):
+    """Adds the `includes` to a list of serialized products, in place."""
+    for name in includes:
+        INCLUDES[name](products)
@@ -0,0 +1,57 @@
+"""
+Streaming catalog export.
+
+Products are read in chunks from a server-side cursor and serialized with
+the compiled ProductSerializer, so memory use is bounded by the chunk
+size whatever the size of the catalog.
+"""
+import csv
+from itertools import islice
+from rest_framework.fields import DateTimeField
+from rest_framework.utils.encoders import JSONEncoder
+from .fastpath import compile_serializer
+from .models import Collection
+from .serializers import ProductSerializer
+
+CHUNK_SIZE = 2000
+CSV_FIELDS = ['id', 'title', 'description', 'slug', 'inventory', 'unit_price',
+              'price_with_tax', 'collection', 'collection_title', 'images', 'last_update']
+
+
+def export_products(queryset, context, chunk_size=None):
+    """Yields one dict per product, with its images and collection title."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    compiled = compile_serializer(ProductSerializer)
+    collection_titles = dict(Collection.objects.values_list('id', 'title'))
+    last_update = DateTimeField()
+    rows = compiled.values(queryset).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        for row, data in zip(chunk, compiled.to_representation(chunk, context)):
+            data['collection_title'] = collection_titles.get(row.collection_id)
+            data['last_update'] = last_update.to_representation(row.last_update)
+            yield data
+
+
+def to_ndjson(products):
+    encoder = JSONEncoder(ensure_ascii=False)
+    for data in products:
+        yield encoder.encode(data) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def to_csv(products):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for data in products:
+        data['images'] = ' '.join(image['image'] for image in data['images'])
+        yield writer.writerow([data[name] for name in CSV_FIELDS])
+
+
+FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
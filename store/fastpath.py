@@ -0,0 +1,121 @@
+"""
+Compiled read-only serialization for list endpoints.
+
+A serializer class is compiled once into a plan: which model columns to
+read with `values_list(named=True)` and how each output field is derived
+from a row. The plan is turned into a generated `row -> dict` function, so
+a list response skips model instantiation and per-field dispatch while
+rendering the same JSON as the DRF serializer.
+"""
+from collections import defaultdict
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.relations import PrimaryKeyRelatedField
+
+# Fields whose to_representation() is the identity for values read from
+# the matching model column.
+IDENTITY_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField)
+
+_compiled = {}
+
+
+def compile_serializer(serializer_class):
+    if serializer_class not in _compiled:
+        _compiled[serializer_class] = CompiledSerializer(serializer_class)
+    return _compiled[serializer_class]
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        opts = self.model._meta
+        # Every concrete column is read, so rows expose the same attributes
+        # a model instance would to method fields and paginators.
+        self.columns = [field.attname for field in opts.concrete_fields]
+        self.pk_index = self.columns.index(opts.pk.attname)
+        self.nested = {}
+
+        lines = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                relation = opts.get_field(field.source)
+                self.nested[name] = (
+                    compile_serializer(field.child.__class__), relation.field.attname)
+                value = f'nested[{name!r}].get(row[{self.pk_index}], [])'
+            elif isinstance(field, serializers.SerializerMethodField):
+                value = f'serializer.{field.method_name}(row)'
+            else:
+                index = self.columns.index(opts.get_field(field.source).attname)
+                if isinstance(field, (PrimaryKeyRelatedField,) + IDENTITY_FIELDS):
+                    value = f'row[{index}]'
+                elif isinstance(field, serializers.FileField):
+                    value = f'None if row[{index}] is None else files[{name!r}](row, row[{index}])'
+                else:
+                    value = (f'None if row[{index}] is None '
+                             f'else fields[{name!r}].to_representation(row[{index}])')
+            lines.append(f'        {name!r}: {value},')
+
+        source = '\n'.join([
+            'def row_to_dict(row, serializer, fields, files, nested):',
+            '    return {',
+            *lines,
+            '    }',
+        ])
+        namespace = {}
+        exec(compile(source, f'<compiled {serializer_class.__name__}>', 'exec'), namespace)
+        self.row_to_dict = namespace['row_to_dict']
+
+    def values(self, queryset):
+        return queryset.prefetch_related(None).values_list(*self.columns, named=True)
+
+    def to_representation(self, rows, context=None):
+        rows = list(rows)
+        serializer = self.serializer_class(context=context or {})
+        fields = serializer.fields
+        files = {
+            name: self._file_converter(field)
+            for name, field in fields.items()
+            if isinstance(field, serializers.FileField)
+        }
+        nested = {
+            name: self._load_nested(compiled, foreign_key, rows, context)
+            for name, (compiled, foreign_key) in self.nested.items()
+        }
+        row_to_dict = self.row_to_dict
+        return [row_to_dict(row, serializer, fields, files, nested) for row in rows]
+
+    def _file_converter(self, field):
+        model_field = self.model._meta.get_field(field.source)
+
+        def convert(row, name):
+            return field.to_representation(model_field.attr_class(row, model_field, name))
+        return convert
+
+    def _load_nested(self, compiled, foreign_key, rows, context):
+        parent_ids = [row[self.pk_index] for row in rows]
+        children = list(compiled.values(
+            compiled.model.objects.filter(**{f'{foreign_key}__in': parent_ids})))
+        index = compiled.columns.index(foreign_key)
+        grouped = defaultdict(list)
+        for child, data in zip(children, compiled.to_representation(children, context)):
+            grouped[child[index]].append(data)
+        return grouped
+
+
+class FastListMixin:
+    """
+    Serves `list` through the compiled serializer. Filtering, ordering and
+    pagination still run on the queryset exactly as before.
+    """
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.to_representation(page, context))
+        return Response(compiled.to_representation(queryset, context))
@@ -7,5 +7,6 @@ class ProductFilter(FilterSet):
         model = Product
         fields = {
             'collection_id' : ['exact'],
-            'unit_price' : ['gt', 'lt']
+            'unit_price' : ['gt', 'lt'],
+            'price_with_tax' : ['gt', 'lt']
         }
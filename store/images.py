@@ -0,0 +1,55 @@
+"""
+Resized WebP derivatives of product images.
+
+Derivatives are stored under the hash of the source image, so the same
+picture uploaded twice is only resized and stored once.
+"""
+import hashlib
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+# Bounding boxes; the aspect ratio is kept.
+SIZES = {
+    'thumb': (160, 160),
+    'medium': (640, 640),
+}
+FULL = 'full'
+WEBP_QUALITY = 80
+
+
+def get_content_hash(file):
+    content_hash = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def get_derivative_name(content_hash, size):
+    return f'store/images/derivatives/{content_hash[:2]}/{content_hash}/{size}.webp'
+
+
+def build_derivatives(file, content_hash):
+    """Returns {size: storage name} after storing the missing derivatives."""
+    derivatives = {}
+    source = None
+    for size, box in SIZES.items():
+        name = get_derivative_name(content_hash, size)
+        if not default_storage.exists(name):
+            if source is None:
+                file.seek(0)
+                source = Image.open(file)
+                source.load()
+                if source.mode not in ('RGB', 'RGBA'):
+                    source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+            image = source.copy()
+            image.thumbnail(box)
+            output = BytesIO()
+            image.save(output, 'WEBP', quality=WEBP_QUALITY)
+            # The storage could still rename a file saved concurrently, so
+            # keep whatever name it actually used.
+            name = default_storage.save(name, ContentFile(output.getvalue()))
+        derivatives[size] = name
+    return derivatives
@@ -0,0 +1,176 @@
+"""
+Bulk product import.
+
+Rows are read lazily from a CSV or NDJSON byte stream, validated in chunks with
+the ProductSerializer rules and upserted by id with one INSERT ... ON
+CONFLICT per chunk, so memory use is bounded by the chunk size.
+"""
+import csv
+import json
+from itertools import islice
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from . import cache
+from .models import Collection, Product, calculate_price_with_tax
+from .search import get_search_backend
+from .serializers import ImportProductSerializer
+
+CHUNK_SIZE = 2000
+# Only the first errors are kept so a bad file cannot exhaust memory.
+MAX_ERRORS = 1000
+UPDATE_FIELDS = ['title', 'slug', 'description', 'unit_price', 'price_with_tax',
+                 'inventory', 'collection', 'last_update']
+
+
+def decode_lines(lines):
+    """Yields each line of a byte stream as text, or None if it is not UTF-8."""
+    for line in lines:
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield None
+
+
+def read_ndjson(lines):
+    for line in decode_lines(lines):
+        if line is None:
+            yield None
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def _strict_lines(lines):
+    # A CSV row may span lines, so a line that cannot be decoded cannot be
+    # reported as one bad row.
+    for line_number, line in enumerate(decode_lines(lines), start=1):
+        if line is None:
+            raise ValidationError({'detail': f'Line {line_number} is not valid UTF-8.'})
+        yield line
+
+
+def read_csv(lines):
+    for row in csv.DictReader(_strict_lines(lines)):
+        # An empty id creates a new product, like a missing one.
+        if not row.get('id'):
+            row.pop('id', None)
+        yield row
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported_count = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    @property
+    def data(self):
+        return {
+            'imported_count': self.imported_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def import_products(rows, chunk_size=None):
+    """
+    Upserts the products in `rows`, an iterable of dicts (or None for a row
+    that could not be parsed). Rows with an id update that product and rows
+    without one create a new product.
+
+    Each chunk commits on its own, so the derived data of the products
+    imported so far is refreshed even when reading the rows fails midway.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    started_at = timezone.now()
+    result = ImportResult()
+    has_ids = False
+    rows = enumerate(rows, start=1)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            products = _validate_chunk(chunk, result)
+            with transaction.atomic():
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=UPDATE_FIELDS)
+            result.imported_count += len(products)
+            has_ids = has_ids or any(product.id for product in products)
+    finally:
+        if has_ids:
+            _reset_sequence()
+        if result.imported_count:
+            _refresh_derived_data(started_at)
+    return result
+
+
+def _validate_chunk(chunk, result):
+    # The collections of a chunk are checked with one query instead of
+    # one per row.
+    ids = set()
+    for _, row in chunk:
+        try:
+            ids.add(int(row['collection']))
+        except (KeyError, TypeError, ValueError):
+            pass
+    serializer = ImportProductSerializer(context={'collection_ids': set(
+        Collection.objects.filter(id__in=ids).values_list('id', flat=True))})
+
+    products = {}
+    for row_number, row in chunk:
+        if row is None:
+            result.add_error(row_number, {'non_field_errors': ['Invalid row.']})
+            continue
+        try:
+            data = serializer.run_validation(row)
+        except ValidationError as error:
+            result.add_error(row_number, error.detail)
+            continue
+        product = Product(
+            collection_id=data.pop('collection'),
+            price_with_tax=calculate_price_with_tax(data['unit_price']),
+            **data)
+        # A repeated id would make the upsert touch a row twice; the last
+        # one wins.
+        products[product.id or -row_number] = product
+    return list(products.values())
+
+
+def _reset_sequence():
+    # Explicit ids do not advance the id sequence on PostgreSQL.
+    statements = connection.ops.sequence_reset_sql(no_style(), [Product])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _refresh_derived_data(started_at):
+    # bulk_create skips the signals that maintain these.
+    backend = get_search_backend()
+    products = Product.objects.filter(last_update__gte=started_at)\
+        .only('id', 'title', 'description').order_by('id')\
+        .iterator(chunk_size=CHUNK_SIZE)
+    while chunk := list(islice(products, CHUNK_SIZE)):
+        backend.index(chunk)
+    Collection.objects.reconcile_products_count()
+    cache.bump(cache.CATALOG)
+    cache.bump_collections(Collection.objects.values_list('id', flat=True))
@@ -0,0 +1,121 @@
+"""
+Admin bulk actions that run as chunked Celery jobs.
+
+`start_job` copies the selected ids into `AdminJobItem` rows with one
+INSERT ... SELECT and queues the `run_admin_job` task. Each run applies the action registered with
+`@job_action` to the next `CHUNK_SIZE` ids after the job's
+`last_object_id`, in a transaction that also
+commits the job's progress, then queues the next run. No transaction
+outlives a chunk, so row locks are held briefly and a failed job keeps
+the chunks it finished.
+"""
+from decimal import Decimal
+from django.db import connections, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least, Round
+from django.utils import timezone
+from . import cache, tasks
+from .models import AdminJob, AdminJobItem, Product
+
+CHUNK_SIZE = 500
+
+ACTIONS = {}
+
+
+def job_action(name):
+    """Registers `function(ids, params)`, which returns the rows it updated."""
+    def register(function):
+        ACTIONS[name] = function
+        return function
+    return register
+
+
+def start_job(action, queryset, description, params=None, user=None):
+    with transaction.atomic():
+        job = AdminJob.objects.create(
+            action=action,
+            description=description,
+            params=params or {},
+            created_by=user)
+        job.total = _insert_items(job, queryset)
+        job.save(update_fields=['total'])
+    transaction.on_commit(lambda: tasks.run_admin_job.delay(job.id), robust=True)
+    return job
+
+
+def _insert_items(job, queryset):
+    # The ids never leave the database, so selecting every row of a large
+    # table costs one statement.
+    selection, params = queryset.order_by().values(object_id=F('pk'))\
+        .query.get_compiler(queryset.db).as_sql()
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote_name(AdminJobItem._meta.db_table)} '
+            f'({quote_name("job_id")}, {quote_name("object_id")}) '
+            f'SELECT %s, selection.{quote_name("object_id")} FROM ({selection}) selection',
+            [job.id, *params])
+        return cursor.rowcount
+
+
+def run_chunk(job_id, chunk_size=None):
+    """Applies the job's action to its next chunk. Returns whether ids are left."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    try:
+        with transaction.atomic():
+            job = AdminJob.objects.select_for_update().get(pk=job_id)
+            if job.status in (AdminJob.STATUS_DONE, AdminJob.STATUS_FAILED):
+                return False
+            # Served by the (job, object_id) unique index.
+            ids = list(job.items.filter(object_id__gt=job.last_object_id)
+                       .order_by('object_id').values_list('object_id', flat=True)[:chunk_size])
+            if ids:
+                job.updated += ACTIONS[job.action](ids, job.params)
+                job.last_object_id = ids[-1]
+            job.processed += len(ids)
+            if not ids or job.processed >= job.total:
+                job.status = AdminJob.STATUS_DONE
+                job.finished_at = timezone.now()
+                job.items.all().delete()
+            else:
+                job.status = AdminJob.STATUS_RUNNING
+            job.save(update_fields=['updated', 'processed', 'last_object_id', 'status', 'finished_at'])
+    except Exception as error:
+        AdminJob.objects.filter(pk=job_id).update(
+            status=AdminJob.STATUS_FAILED, error=str(error), finished_at=timezone.now())
+        raise
+    return job.status == AdminJob.STATUS_RUNNING
+
+
+def _invalidate_products(ids):
+    # update() skips the signals that invalidate cached products.
+    products = list(Product.objects.filter(pk__in=ids).only('id', 'collection_id'))
+    transaction.on_commit(lambda: cache.bump_products(products))
+
+
+@job_action('clear_inventory')
+def clear_inventory(ids, params):
+    updated = Product.objects.filter(pk__in=ids)\
+        .update(inventory=0, last_update=timezone.now())
+    _invalidate_products(ids)
+    return updated
+
+
+MIN_UNIT_PRICE = Decimal('1')
+MAX_UNIT_PRICE = Decimal('9999.99')
+
+
+@job_action('adjust_prices')
+def adjust_prices(ids, params):
+    """Changes unit prices by `params['percent']`, within the field's bounds."""
+    multiplier = 1 + Decimal(params['percent']) / 100
+    products = Product.objects.filter(pk__in=ids)
+    unit_price = Round(F('unit_price') * Value(multiplier), 2,
+                       output_field=models.DecimalField(max_digits=6, decimal_places=2))
+    updated = products.update(
+        unit_price=Least(Greatest(unit_price, Value(MIN_UNIT_PRICE)), Value(MAX_UNIT_PRICE)),
+        last_update=timezone.now())
+    products.recompute_price_with_tax()
+    _invalidate_products(ids)
+    return updated
@@ -0,0 +1,70 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from store.models import Product
+from storefront20.db.pool import metrics
+
+
+class Command(BaseCommand):
+    help = 'Compares /store/products/<id>/ latency with new, persistent and pooled connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--pool-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        product_id = Product.objects.values_list('id', flat=True).first()
+        if product_id is None:
+            raise CommandError('There are no products, run seed_db first.')
+        modes = {
+            'new': (0, None),
+            'persistent': (60, None),
+        }
+        if connection.settings_dict['ENGINE'] == 'storefront20.db.pooled_postgresql':
+            modes['pooled'] = (0, {'max_size': options['pool_size']})
+        else:
+            print('Skipping the pooled mode, the database ENGINE is not pooled_postgresql.')
+
+        settings_dict = connection.settings_dict
+        original = settings_dict['CONN_MAX_AGE'], settings_dict['OPTIONS'].get('POOL')
+        try:
+            # Without the response cache every request queries the database.
+            with override_settings(CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+                for mode, (conn_max_age, pool) in modes.items():
+                    self.configure(conn_max_age, pool)
+                    latencies = self.run(f'/store/products/{product_id}/', options['requests'])
+                    print(f'{mode:>10}: p50 {self.percentile(latencies, 0.5):.2f}ms, '
+                          f'p99 {self.percentile(latencies, 0.99):.2f}ms')
+                    # Only recorded by the pooled_postgresql backend.
+                    acquisition = metrics.snapshot()
+                    if acquisition['count']:
+                        print(f'{"":>10}  {acquisition["count"]} connections acquired, '
+                              f'p50 {acquisition["p50"]:.2f}ms, p99 {acquisition["p99"]:.2f}ms')
+        finally:
+            self.configure(*original)
+
+    def configure(self, conn_max_age, pool):
+        connection.close()
+        metrics.reset()
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        connection.settings_dict['OPTIONS'].pop('POOL', None)
+        if pool is not None:
+            connection.settings_dict['OPTIONS']['POOL'] = pool
+
+    def run(self, url, count):
+        client = Client(HTTP_HOST='localhost')
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            client.get(url)
+            # The test client keeps connections open; do what the request
+            # handler does when a request finishes.
+            close_old_connections()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    def percentile(self, latencies, fraction):
+        latencies = sorted(latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
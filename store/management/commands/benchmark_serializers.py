@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from store.fastpath import compile_serializer
+from store.models import Collection, Product, ProductImage
+from store.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares product list serialization throughput with and without the compiled fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        # The sample catalog is created in a transaction that is rolled back.
+        with transaction.atomic():
+            self.create_products(count)
+            request = Request(APIRequestFactory().get('/store/products/', HTTP_HOST='localhost'))
+            context = {'request': request}
+            queryset = Product.objects.prefetch_related('images').order_by('id')[:count]
+            compiled = compile_serializer(ProductSerializer)
+
+            def drf():
+                return ProductSerializer(queryset.all(), many=True, context=context).data
+
+            def fast():
+                return compiled.to_representation(compiled.values(queryset.all()), context)
+
+            renderer = JSONRenderer()
+            assert renderer.render(drf()) == renderer.render(fast())
+            for name, serialize in [('serializer', drf), ('compiled', fast)]:
+                elapsed = min(self.time(serialize) for _ in range(options['repeat']))
+                print(f'{name:>10}: {elapsed:.3f}s, {count / elapsed:,.0f} products/s')
+            transaction.set_rollback(True)
+
+    def create_products(self, count):
+        collection = Collection.objects.create(title='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(title=f'Product {index}', slug='-', description='Benchmark product',
+                    unit_price=index % 9000 + 1, inventory=10, collection=collection)
+            for index in range(count)
+        ], batch_size=1000)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'store/images/{product.id}.jpg')
+            for product in products
+        ], batch_size=1000)
+
+    def time(self, serialize):
+        start = time.perf_counter()
+        serialize()
+        return time.perf_counter() - start
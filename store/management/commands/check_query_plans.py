@@ -0,0 +1,91 @@
+from uuid import uuid4
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from likes.models import LikedItem
+from store.models import CartItem, Collection, Customer, Order, Product, ProductImage, Review
+from tags.models import TaggedItem
+
+
+def uses_index(plan, index_names):
+    """Whether the plan uses one of `index_names`, which both PostgreSQL and SQLite print."""
+    return any(index_name in plan for index_name in index_names)
+
+
+class Command(BaseCommand):
+    help = 'Checks that the hot store queries are planned with the indexes meant for them.'
+
+    def handle(self, *args, **options):
+        print('Checking query plans...')
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Plans are only meaningful on statistics of realistic data,
+                # e.g. after seed_db.
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            for name, queryset, index_names in self.get_queries():
+                plan = queryset.explain()
+                if options['verbosity'] > 1:
+                    print(plan)
+                if uses_index(plan, index_names):
+                    print(f'  OK {name}')
+                else:
+                    print(f'FAIL {name}, expected {" or ".join(sorted(index_names))}')
+                    failures.append(name)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f'{len(failures)} queries do not use their index: {", ".join(failures)}')
+
+    def get_indexes(self, model, column):
+        """The names of the indexes of `model` that lead with `column`."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return {
+            name for name, constraint in constraints.items()
+            if constraint['index'] and constraint['columns'][:1] == [column]
+        }
+
+    def get_queries(self):
+        collection_id = Collection.objects.values_list('id', flat=True).first() or 1
+        product_id = Product.objects.values_list('id', flat=True).first() or 1
+        customer_id = Customer.objects.values_list('id', flat=True).first() or 1
+        products = Product.objects.filter(collection_id=collection_id)
+        queries = [
+            ('products by collection', products.order_by('title')[:10],
+                {'product_collection_title_idx'}),
+            ('products by collection and price', products.filter(
+                unit_price__gt=10, unit_price__lt=50).order_by('unit_price')[:10],
+                {'product_collection_price_idx'}),
+            ('products by collection and last update', products.order_by('-last_update')[:10],
+                {'product_collection_update_idx'}),
+            ('products by title', Product.objects.order_by('title')[:10], {'product_title_idx'}),
+            ('products by price', Product.objects.order_by('unit_price')[:10],
+                {'product_unit_price_idx'}),
+            ('products by last update', Product.objects.order_by('-last_update')[:10],
+                {'product_last_update_idx'}),
+            ('cart items', CartItem.objects.with_total_price().filter(cart_id=uuid4()),
+                self.get_indexes(CartItem, 'cart_id')),
+            ('orders by customer', Order.objects.filter(
+                customer_id=customer_id).order_by('-placed_at', '-id')[:10],
+                {'order_customer_placed_idx'}),
+            ('orders', Order.objects.order_by('-placed_at', '-id')[:10], {'order_placed_idx'}),
+            ('reviews', Review.objects.filter(product_id=product_id),
+                self.get_indexes(Review, 'product_id')),
+            ('product images', ProductImage.objects.filter(product_id=product_id),
+                self.get_indexes(ProductImage, 'product_id')),
+            ('tagged items', TaggedItem.objects.get_tags_for(Product, product_id),
+                {'taggeditem_object_idx'}),
+            ('liked items', LikedItem.objects.filter(
+                content_type=ContentType.objects.get_for_model(Product), object_id=product_id),
+                {'likeditem_object_idx'}),
+        ]
+        if connection.vendor == 'postgresql':
+            # The admin search boxes; the UPPER() indexes are PostgreSQL only.
+            queries += [
+                ('products by title prefix', Product.objects.filter(title__istartswith='a')[:10],
+                    {'product_title_prefix_idx'}),
+                ('customers by name prefix', Customer.objects.filter(
+                    user__last_name__istartswith='a')[:10], {'user_last_name_prefix_idx'}),
+            ]
+        return queries
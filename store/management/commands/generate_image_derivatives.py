@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from store.models import ProductImage
+from store.tasks import generate_image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Queues derivative generation for product images that have none.'
+
+    def handle(self, *args, **options):
+        print('Queueing image derivatives...')
+        image_ids = ProductImage.objects.filter(derivatives={}).values_list('id', flat=True)
+        count = 0
+        for image_id in image_ids.iterator():
+            generate_image_derivatives.delay(image_id)
+            count += 1
+        print(f'{count} images were queued.')
@@ -0,0 +1,31 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from store import importer
+
+
+class Command(BaseCommand):
+    help = 'Upserts products from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=importer.READERS,
+                            help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        input_format = options['format'] or path.suffix.lstrip('.')
+        if input_format not in importer.READERS:
+            raise CommandError(f'Cannot tell the format of {path}, use --format.')
+
+        print(f'Importing products from {path}...')
+        with path.open('rb') as file:
+            try:
+                result = importer.import_products(
+                    importer.READERS[input_format](file), options['chunk_size'])
+            except ValidationError as error:
+                raise CommandError(error.detail['detail'])
+        for error in result.errors:
+            print(f'Row {error["row"]}: {error["errors"]}')
+        print(f'{result.imported_count} products were imported, {result.error_count} rows were rejected.')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from store.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product search index from scratch.'
+
+    def handle(self, *args, **options):
+        print('Rebuilding the search index...')
+        get_search_backend().rebuild()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from store import cache
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored tax-inclusive price of every product.'
+
+    def handle(self, *args, **options):
+        print('Recomputing product prices with tax...')
+        updated_count = Product.objects.recompute_price_with_tax()
+        # update() skips the signals that invalidate cached responses.
+        cache.bump(cache.CATALOG)
+        print(f'{updated_count} products were updated.')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store import cache
+from store.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored products_count of every collection.'
+
+    def handle(self, *args, **options):
+        print('Reconciling collection product counts...')
+        with transaction.atomic():
+            updated_count = Collection.objects.reconcile_products_count()
+            # update() skips the signals that invalidate cached collections.
+            transaction.on_commit(lambda: cache.bump_collections(
+                Collection.objects.values_list('id', flat=True)))
+        print(f'{updated_count} collections were updated.')
@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import connection
 from pathlib import Path
@@ -15,3 +16,8 @@ class Command(BaseCommand):
 
         with connection.cursor() as cursor:
             cursor.execute(sql)
+
+        # Raw SQL bypasses the model signals that keep these in sync.
+        call_command('rebuild_search_index')
+        call_command('reconcile_products_count')
+        call_command('recompute_price_with_tax')
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from collections import Counter
+
+
+# A frozen copy of store.search.tokenize, so that this migration keeps
+# building the same index if the tokenizer changes.
+def tokenize(text):
+    return [token[:64] for token in re.findall(r'\w+', text.lower())]
+
+
+BATCH_SIZE = 1000
+
+
+def index_products(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductSearchTerm = apps.get_model('store', 'ProductSearchTerm')
+    # Flushed in batches, like InvertedIndexSearchBackend.rebuild(), so
+    # memory does not grow with the catalog.
+    batch = []
+    products = Product.objects.only('id', 'title', 'description').order_by('id')
+    for product in products.iterator(chunk_size=BATCH_SIZE):
+        counts = Counter()
+        for token in tokenize(product.title):
+            counts[token] += 3
+        for token in tokenize(product.description or ''):
+            counts[token] += 1
+        batch.extend(
+            ProductSearchTerm(product_id=product.id, token=token, weight=weight)
+            for token, weight in counts.items())
+        if len(batch) >= BATCH_SIZE:
+            ProductSearchTerm.objects.bulk_create(batch)
+            batch = []
+    ProductSearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_alter_productimage_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='store.product')),
+            ],
+            options={
+                'unique_together': {('token', 'product')},
+            },
+        ),
+        migrations.RunPython(index_products, migrations.RunPython.noop),
+    ]
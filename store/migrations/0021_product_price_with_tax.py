@@ -0,0 +1,31 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:41
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Round
+
+
+def compute_price_with_tax(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    multiplier = 1 + Decimal(settings.STORE_TAX_RATE)
+    Product.objects.update(price_with_tax=Round(
+        F('unit_price') * Value(multiplier), 2,
+        output_field=models.DecimalField(max_digits=8, decimal_places=2)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_collection_products_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='price_with_tax',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.RunPython(compute_price_with_tax, migrations.RunPython.noop),
+    ]
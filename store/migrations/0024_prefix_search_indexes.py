@@ -0,0 +1,14 @@
+from django.db import migrations
+from storefront20.db.indexes import prefix_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0023_productimage_derivatives'),
+    ]
+
+    operations = [
+        prefix_search_index('product_title_prefix_idx', 'store_product', 'title'),
+        prefix_search_index('collection_title_prefix_idx', 'store_collection', 'title'),
+    ]
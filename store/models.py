@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.validators import MinValueValidator , FileExtensionValidator
+from django.db.models import Case, Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+from decimal import ROUND_HALF_UP, Decimal
 from uuid import uuid4
 
-from store import permissions
+from store import cache, permissions
 from store.validators import validate_file_size
 
 
@@ -17,9 +20,19 @@ class Promtion(models.Model):
     # products
     
 
+class CollectionQuerySet(models.QuerySet):
+    def reconcile_products_count(self):
+        counts = Product.objects.filter(collection=OuterRef('pk'))\
+            .order_by().values('collection').annotate(count=Count('id')).values('count')
+        return self.update(products_count=Coalesce(Subquery(counts), Value(0)))
+
+
 class Collection(models.Model):
     title = models.CharField(max_length = 255)
     featured_product = models.ForeignKey('Product', on_delete = models.SET_NULL, null=True, related_name = '+')
+    products_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CollectionQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -29,6 +42,23 @@ class Collection(models.Model):
 
 
 
+def get_tax_multiplier():
+    return 1 + Decimal(settings.STORE_TAX_RATE)
+
+
+def calculate_price_with_tax(unit_price):
+    # Rounds half away from zero like ROUND() does in the database.
+    return (Decimal(unit_price) * get_tax_multiplier())\
+        .quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class ProductQuerySet(models.QuerySet):
+    def recompute_price_with_tax(self):
+        return self.update(price_with_tax=Round(
+            F('unit_price') * Value(get_tax_multiplier()), 2,
+            output_field=models.DecimalField(max_digits=8, decimal_places=2)))
+
+
 class Product(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField()
@@ -37,23 +67,71 @@ class Product(models.Model):
             max_digits=6 , 
             decimal_places = 2,
             validators = [MinValueValidator(1)])
+    # Kept in sync by save() and the recompute_price_with_tax command.
+    price_with_tax = models.DecimalField(
+            max_digits=8,
+            decimal_places=2,
+            null=True,
+            editable=False,
+            db_index=True)
     inventory = models.IntegerField(validators = [MinValueValidator(0)])
     last_update = models.DateTimeField(auto_now=True)
+    # Indexed by the composite (collection, ...) indexes below.
     collection = models.ForeignKey(
-        Collection, on_delete = models.PROTECT, related_name= 'products')
+        Collection, on_delete = models.PROTECT, related_name= 'products', db_index=False)
     promotions = models.ManyToManyField(Promtion, blank = True)
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded collection so signal handlers can tell
+        # when a product is moved to another collection.
+        instance._loaded_collection_id = instance.__dict__.get('collection_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.price_with_tax = calculate_price_with_tax(self.unit_price)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'unit_price' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'price_with_tax'}
+        super().save(*args, **kwargs)
+        self._loaded_collection_id = self.collection_id
+
     class Meta:
-        ordering = ['title']    
+        ordering = ['title']
+        indexes = [
+            # The product list filters by collection and orders by the
+            # ordering_fields of ProductViewSet.
+            models.Index(fields=['collection', 'title'], name='product_collection_title_idx'),
+            models.Index(fields=['collection', 'unit_price'], name='product_collection_price_idx'),
+            models.Index(fields=['collection', 'last_update'], name='product_collection_update_idx'),
+            models.Index(fields=['title'], name='product_title_idx'),
+            models.Index(fields=['unit_price'], name='product_unit_price_idx'),
+            models.Index(fields=['last_update'], name='product_last_update_idx'),
+        ]
+
+class ProductSearchTerm(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    token = models.CharField(max_length=64, db_index=True)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [['token', 'product']]
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete= models.CASCADE, related_name='images')
     image = models.ImageField(
         upload_to='store/images',
         validators=[validate_file_size])
+    # Filled in by the generate_image_derivatives task.
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Customer(models.Model):
@@ -91,6 +169,19 @@ class Customer(models.Model):
 
     
 
+class OrderQuerySet(models.QuerySet):
+    def with_total_price(self):
+        return self.annotate(
+            order_total_price=Coalesce(
+                Sum(F('items__quantity') * F('items__unit_price'),
+                    output_field=models.DecimalField()),
+                Value(0), output_field=models.DecimalField()))
+
+    def with_items(self):
+        return self.prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.with_total_price()))
+
+
 class Order(models.Model):
     PAYMENT_STATUS_PENDING = 'P'
     PAYMENT_STATUS_COMPLETE = 'C'
@@ -107,11 +198,32 @@ class Order(models.Model):
             max_length=1 , choices = PAYMENT_STATUS_CHOICES , default = PAYMENT_STATUS_PENDING)
 
     customer = models.ForeignKey(Customer, on_delete = models.PROTECT)
+
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         permissions = [
             ('cancel_order', 'Can cancel orders')
         ]
+        indexes = [
+            # Matches the ordering of OrderViewSet.get_queryset(). Orders are
+            # narrow, so on PostgreSQL the included columns let a page of
+            # them be read from the index alone.
+            models.Index(fields=['customer', '-placed_at', '-id'], include=['payment_status'],
+                         name='order_customer_placed_idx'),
+            models.Index(fields=['-placed_at', '-id'], include=['customer', 'payment_status'],
+                         name='order_placed_idx'),
+        ]
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_total_price(self):
+        # Load only the product columns SimpleProductSerializer renders.
+        return self.select_related('product')\
+            .only('id', 'order_id', 'quantity', 'unit_price',
+                  'product__id', 'product__title', 'product__unit_price')\
+            .annotate(total_price=ExpressionWrapper(
+                F('quantity') * F('unit_price'), output_field=models.DecimalField()))
 
 
 class OrderItem(models.Model):
@@ -120,6 +232,8 @@ class OrderItem(models.Model):
     quantity = models.PositiveSmallIntegerField()
     unit_price = models.DecimalField(max_digits = 6, decimal_places = 2)
 
+    objects = OrderItemQuerySet.as_manager()
+
 class Address(models.Model):
     street = models.CharField(max_length = 255)
     city = models.CharField(max_length = 255)
@@ -127,10 +241,65 @@ class Address(models.Model):
             Customer, on_delete = models.CASCADE)
     zipcode = models.PositiveBigIntegerField(null = True)
 
+class CartQuerySet(models.QuerySet):
+    def with_total_price(self):
+        return self.prefetch_related(
+            models.Prefetch('items', queryset=CartItem.objects.with_total_price())
+        ).annotate(
+            cart_total_price=Coalesce(
+                Sum(F('items__quantity') * F('items__product__unit_price'),
+                    output_field=models.DecimalField()),
+                Value(0), output_field=models.DecimalField()))
+
+
 class Cart(models.Model):
     id = models.UUIDField(default=uuid4, primary_key=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_total_price(self):
+        return self.select_related('product').annotate(
+            total_price=ExpressionWrapper(
+                F('quantity') * F('product__unit_price'),
+                output_field=models.DecimalField()))
+
+    def add_items(self, cart_id, quantities):
+        """
+        Adds `quantities` ({product_id: quantity}) to a cart with an F()
+        update of the existing rows followed by one insert of the missing
+        ones. If a concurrent request inserts the same row first, the
+        unique (cart, product) constraint fails and we retry as an update.
+        """
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    self._add_items(cart_id, quantities)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+        # The F() update skips post_save, so invalidate the cart here.
+        cache.bump(cache.cart_scope(cart_id))
+
+    def _add_items(self, cart_id, quantities):
+        items = self.filter(cart_id=cart_id, product_id__in=quantities)
+        updated_count = items.update(quantity=F('quantity') + Case(
+            *[When(product_id=product_id, then=Value(quantity))
+              for product_id, quantity in quantities.items()],
+            output_field=models.PositiveSmallIntegerField()))
+        if updated_count == len(quantities):
+            return
+        existing = set(items.values_list('product_id', flat=True)) if updated_count else set()
+        self.bulk_create([
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if product_id not in existing
+        ])
+
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete = models.CASCADE, related_name='items')
     product = models.ForeignKey(Product , on_delete = models.CASCADE)
@@ -138,6 +307,8 @@ class CartItem(models.Model):
         validators = [MinValueValidator(1)]
     )
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = [['cart', 'product']]
 
@@ -157,3 +328,49 @@ class Review(models.Model):
 
 
 
+
+
+class AdminJob(models.Model):
+    """An admin bulk action running in the background, see store.jobs."""
+    STATUS_PENDING = 'P'
+    STATUS_RUNNING = 'R'
+    STATUS_DONE = 'D'
+    STATUS_FAILED = 'F'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    action = models.CharField(max_length=255)
+    description = models.CharField(max_length=255)
+    params = models.JSONField(default=dict)
+    status = models.CharField(
+            max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    # The selection is processed in object_id order; the last id done.
+    last_object_id = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return self.description
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class AdminJobItem(models.Model):
+    """One selected object of an AdminJob."""
+    job = models.ForeignKey(AdminJob, on_delete=models.CASCADE, related_name='items')
+    object_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        unique_together = [['job', 'object_id']]
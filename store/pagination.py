@@ -1,4 +1,160 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
 
 class DefaultPagination(PageNumberPagination):
-    page_size = 10
\ No newline at end of file
+    page_size = 10
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Opt-in keyset pagination (`?pagination=keyset` or any `?cursor=`).
+    The ordering always ends with the primary key, and the cursor holds the
+    values of every ordering field of the row it points at. Pages are
+    located with a row comparison on all of them, such as
+    `WHERE (price, id) > (5, 42)`, so neither COUNT(*) nor OFFSET is ever
+    run, however many rows share a price.
+    """
+    page_size = 10
+    ordering = 'title'
+    mode_query_param = 'pagination'
+    mode = 'keyset'
+
+    @classmethod
+    def is_requested(cls, request):
+        if request is None:
+            return False
+        params = request.query_params
+        return (params.get(cls.mode_query_param) == cls.mode
+                or cls.cursor_query_param in params)
+
+    def get_ordering(self, request, queryset, view):
+        # Honour the view's OrderingFilter fields, falling back to
+        # our own default when no `?ordering=` was given.
+        ordering = list(OrderingFilter().get_ordering(request, queryset, view) or [self.ordering])
+        # Titles and prices repeat: the primary key makes every position
+        # unique, so DRF never needs an offset within one.
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination filters on the first ordering field alone; the
+        # position is applied here instead, and the rest of its bookkeeping
+        # is mirrored with the offset left out.
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset.model, ordering, current_position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            # The row after the page, as CursorPagination's links expect.
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position, self.previous_position = following_position, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_filter(self, model, ordering, position):
+        """
+        `(a, b, ...) > (x, y, ...)` in the direction of each field, as
+        `a > x OR (a = x AND b > y) OR ...`.
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            values = [model._meta.get_field(order.lstrip('-')).to_python(value)
+                      for order, value in zip(ordering, values)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = {}
+        for order, value in zip(ordering, values):
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator for admin changelists over large tables. Results are
+    counted exactly up to `threshold` rows; above that the count comes from
+    the PostgreSQL planner, or from an exact count cached for
+    `cache_timeout` seconds on other databases. An estimate can be off, so
+    the last pages may come out short or empty.
+    """
+    threshold = 10000
+    cache_timeout = 5 * 60
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.order_by()
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = self.get_planner_estimate(queryset)
+            if estimate >= self.threshold:
+                return estimate
+            return queryset.count()
+        key = 'admin:count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            if count >= self.threshold:
+                cache.set(key, count, self.cache_timeout)
+        return count
+
+    def get_planner_estimate(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        # psycopg2 decodes json columns, other drivers return a string.
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
@@ -0,0 +1,108 @@
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+from .models import Product, ProductSearchTerm
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+
+
+def tokenize(text):
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def get_search_backend():
+    return import_string(settings.STORE_SEARCH_BACKEND)()
+
+
+class BaseSearchBackend:
+    def index(self, products):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+
+class ScanSearchBackend(BaseSearchBackend):
+    """The plain `icontains` scan over title and description."""
+    search_fields = ['title', 'description']
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """
+    Keeps a token -> product index in `ProductSearchTerm`. Each term of
+    the query must prefix-match an indexed token, and results are ranked
+    by the summed weight of the matching tokens.
+    """
+    weights = {'title': 3, 'description': 1}
+    batch_size = 1000
+
+    def get_terms(self, product):
+        counts = Counter()
+        for field, weight in self.weights.items():
+            for token in tokenize(getattr(product, field) or ''):
+                counts[token] += weight
+        return [
+            ProductSearchTerm(product_id=product.pk, token=token, weight=weight)
+            for token, weight in counts.items()
+        ]
+
+    def index(self, products):
+        products = list(products)
+        terms = [term for product in products for term in self.get_terms(product)]
+        with transaction.atomic():
+            ProductSearchTerm.objects.filter(
+                product_id__in=[product.pk for product in products]).delete()
+            ProductSearchTerm.objects.bulk_create(terms, batch_size=self.batch_size)
+
+    def rebuild(self):
+        with transaction.atomic():
+            ProductSearchTerm.objects.all().delete()
+            products = Product.objects.only('id', *self.weights).order_by('id')
+            batch = []
+            for product in products.iterator(chunk_size=self.batch_size):
+                batch.extend(self.get_terms(product))
+                if len(batch) >= self.batch_size:
+                    ProductSearchTerm.objects.bulk_create(batch)
+                    batch = []
+            ProductSearchTerm.objects.bulk_create(batch)
+
+    def search(self, queryset, terms):
+        tokens = set(tokenize(' '.join(terms)))
+        if not tokens:
+            return queryset
+        matching = Q()
+        for token in tokens:
+            queryset = queryset.filter(pk__in=ProductSearchTerm.objects
+                .filter(token__startswith=token).values('product_id'))
+            matching |= Q(token__startswith=token)
+        rank = ProductSearchTerm.objects\
+            .filter(matching, product_id=OuterRef('pk'))\
+            .values('product_id')\
+            .annotate(rank=Sum('weight'))\
+            .values('rank')
+        return queryset.annotate(search_rank=Subquery(rank))\
+            .order_by('-search_rank', 'title')
+
+
+class ProductSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend().search(queryset, terms)
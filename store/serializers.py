@@ -1,7 +1,12 @@
+from collections import Counter
 from decimal import Decimal
-from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.utils import timezone
 from rest_framework import serializers
-from .signals import order_created
+from . import cache, images
+from .signals import order_created, dispatch
 from .models import Cart, CartItem, Customer, Order, OrderItem, Product, Collection, ProductImage, Review
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -11,7 +16,34 @@ class CollectionSerializer(serializers.ModelSerializer):
         model = Collection
         fields = ['id','title','products_count']
     
+class ProductImageField(serializers.ImageField):
+    """
+    Renders the derivative picked by `?image_size=` (see store.images), or
+    the original image while the derivatives are not generated yet.
+    """
+    def to_representation(self, value):
+        request = self.context.get('request')
+        size = request.query_params.get('image_size') if request else None
+        name = value.instance.derivatives.get(size) if size in images.SIZES else None
+        if not name:
+            return super().to_representation(value)
+        return request.build_absolute_uri(default_storage.url(name))
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: ProductImageField,
+    }
+
+    def validate(self, attrs):
+        if 'image' in attrs:
+            # Set by LimitedHashingUploadHandler; otherwise the derivatives
+            # task computes it.
+            attrs['content_hash'] = getattr(attrs['image'], 'content_hash', '')
+            attrs['derivatives'] = {}
+        return attrs
+
     def create(self, validated_data):
         product_id = self.context['product_id']
         return ProductImage.objects.create(product_id=product_id, **validated_data)
@@ -23,16 +55,26 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True , read_only=True)
-    price_with_tax = serializers.SerializerMethodField(method_name='calculate_tax')
-    
-    def calculate_tax(self, product: Product):
-        return product.unit_price * Decimal(1.1)
     
     class Meta:
         model = Product
         fields = ['id','title','description','slug','inventory','unit_price','price_with_tax','collection','images']
 
-    
+
+
+class ImportProductSerializer(ProductSerializer):
+    """
+    Validates one imported row. The collection is checked against the ids
+    in `context['collection_ids']`, loaded once per chunk by the importer.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    collection = serializers.IntegerField()
+
+    def validate_collection(self, value):
+        if value not in self.context['collection_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
     
 class SimpleProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -52,10 +94,8 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = SimpleProductSerializer()
-    total_price = serializers.SerializerMethodField()
-
-    def get_total_price(self, cart_item:CartItem):
-        return cart_item.product.unit_price * cart_item.quantity
+    # Computed by CartItem.objects.with_total_price()
+    total_price = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
@@ -65,10 +105,13 @@ class CartItemSerializer(serializers.ModelSerializer):
 class CartSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only = True)
     items = CartItemSerializer(many = True, read_only=True)
-    cart_total_price = serializers.SerializerMethodField()
+    # Computed by Cart.objects.with_total_price()
+    cart_total_price = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
 
-    def get_cart_total_price(self, cart:Cart):
-        return sum([item.product.unit_price * item.quantity for item in cart.items.all()])
+    def create(self, validated_data):
+        cart = super().create(validated_data)
+        cart.cart_total_price = Decimal(0) # a new cart is always empty
+        return cart
 
     class Meta:
         model = Cart
@@ -88,13 +131,8 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         product_id = self.validated_data['product_id']
         quantity = self.validated_data['quantity']
 
-        try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(cart_id=cart_id, **self.validated_data )
+        CartItem.objects.add_items(cart_id, {product_id: quantity})
+        self.instance = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
         return self.instance
             
     class Meta:
@@ -102,6 +140,41 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         fields = ['id','product_id', 'quantity']
 
 
+class CartItemEntrySerializer(serializers.ModelSerializer):
+    product_id = serializers.IntegerField()
+
+    class Meta:
+        model = CartItem
+        fields = ['product_id', 'quantity']
+
+
+class AddCartItemsSerializer(serializers.ListSerializer):
+    child = CartItemEntrySerializer()
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
+
+    def validate(self, items):
+        product_ids = {item['product_id'] for item in items}
+        found_ids = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        if product_ids - found_ids:
+            raise serializers.ValidationError(
+                f'No product with the given ID was found: {sorted(product_ids - found_ids)}.')
+        return items
+
+    def save(self, **kwargs):
+        cart_id = self.context['cart_id']
+        quantities = Counter()
+        for item in self.validated_data:
+            quantities[item['product_id']] += item['quantity']
+
+        CartItem.objects.add_items(cart_id, quantities)
+        self.instance = list(CartItem.objects.with_total_price()
+                             .filter(cart_id=cart_id, product_id__in=quantities))
+        return self.instance
+
+
 class UpdateCartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
@@ -118,10 +191,8 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = SimpleProductSerializer()
-    total_price = serializers.SerializerMethodField()
-
-    def get_total_price(self, item:OrderItem):
-        return item.unit_price * item.quantity
+    # Computed by OrderItem.objects.with_total_price()
+    total_price = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
@@ -130,10 +201,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
-    order_total_price = serializers.SerializerMethodField()
+    # Computed by Order.objects.with_total_price()
+    order_total_price = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
 
-    def get_order_total_price(self, order:Order):
-        return sum([item.unit_price * item.quantity for item in order.items.all()])
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta: 
         model = Order
@@ -149,39 +224,61 @@ class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
+        items_count = Cart.objects.filter(pk=cart_id)\
+            .annotate(items_count=Count('items'))\
+            .values_list('items_count', flat=True).first()
+        if items_count is None:
             raise serializers.ValidationError('No cart with the given ID was found.')
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
+        if items_count == 0:
             raise serializers.ValidationError('The cart with the given ID is empty.')
         return cart_id
 
     def save(self, **kwargs):
-        with transaction.atomic():
-            customer = Customer.objects.get(user_id=self.context['user_id'])
-            order = Order.objects.create(customer = customer)
-            cart_id = self.validated_data['cart_id']
+        cart_id = self.validated_data['cart_id']
 
-            cart_items = CartItem.objects.select_related('product')\
-                        .filter(cart_id = cart_id)
-        
-            order_items = [
+        with transaction.atomic():
+            customer_id = self.context['customer_id']
+
+            # Lock the cart items so the same cart cannot be checked out
+            # twice, then the products in primary key order so concurrent
+            # checkouts always acquire row locks in the same order.
+            quantities = dict(CartItem.objects.select_for_update()
+                              .filter(cart_id=cart_id)
+                              .values_list('product_id', 'quantity'))
+            if not quantities:
+                raise serializers.ValidationError(
+                    {'cart_id': ['The cart with the given ID is empty.']})
+
+            products = list(Product.objects.select_for_update()
+                            .filter(pk__in=quantities)
+                            .only('id', 'unit_price', 'inventory', 'collection_id')
+                            .order_by('pk'))
+            oversold = [product.id for product in products
+                        if product.inventory < quantities[product.id]]
+            if oversold:
+                raise serializers.ValidationError(
+                    {'cart_id': [f'Not enough inventory for products {oversold}.']})
+
+            order = Order.objects.create(customer_id = customer_id)
+            OrderItem.objects.bulk_create([
                 OrderItem(
                     order = order,
-                    product = item.product,
-                    quantity = item.quantity,
-                    unit_price= item.product.unit_price,
-                ) for item in cart_items
-            ]
-            OrderItem.objects.bulk_create(order_items)
-            
+                    product = product,
+                    quantity = quantities[product.id],
+                    unit_price= product.unit_price,
+                ) for product in products
+            ])
+
+            Product.objects.filter(pk__in=quantities).update(
+                inventory=F('inventory') - Case(
+                    *[When(pk=product_id, then=Value(quantity))
+                      for product_id, quantity in quantities.items()],
+                    output_field=IntegerField()),
+                last_update=timezone.now())
+            transaction.on_commit(lambda: cache.bump_products(products))
+
             Cart.objects.filter(pk=cart_id).delete()
 
-            order_created.send_robust(self.__class__, order = order)
+            dispatch.send(order_created, self.__class__, order = order)
 
         return order
-
-
-
-
-
-    
\ No newline at end of file
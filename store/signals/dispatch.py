@@ -0,0 +1,92 @@
+import threading
+from collections import defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from . import order_created
+
+# Signals that may be sent asynchronously, by name.
+SIGNALS = {
+    'order_created': order_created,
+}
+
+_local = threading.local()
+
+
+def send(signal, sender, **kwargs):
+    """
+    Sends a store signal. With STORE_ASYNC_SIGNALS on, the event is queued
+    and every event sent in the same transaction is handed to Celery as a
+    single batch once the transaction commits; receivers then run in the
+    worker. Model instances in kwargs are passed by primary key.
+    """
+    if not settings.STORE_ASYNC_SIGNALS:
+        return signal.send_robust(sender, **kwargs)
+
+    from ..tasks import dispatch_signals
+    event = encode_event(signal, sender, kwargs)
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # Outside a transaction on_commit() runs the callback right away,
+        # with the same error handling.
+        transaction.on_commit(lambda: dispatch_signals.delay([event]), robust=True)
+        return
+    _get_pending_batch(connection).append(event)
+
+
+class _Batch(list):
+    def send(self):
+        from ..tasks import dispatch_signals
+        dispatch_signals.delay(list(self))
+
+
+def _get_pending_batch(connection):
+    # A batch is reused while its on_commit callback is still queued; a
+    # rollback discards the callback, and with it the stale batch.
+    batch = getattr(_local, 'batch', None)
+    if batch is None or not any(
+            getattr(callback, '__self__', None) is batch
+            for _, callback, *_ in connection.run_on_commit):
+        batch = _local.batch = _Batch()
+        # The writes are committed by now: an unreachable broker is logged
+        # rather than turned into an error response the client would retry.
+        transaction.on_commit(batch.send, robust=True)
+    return batch
+
+
+def encode_event(signal, sender, kwargs):
+    signal_names = {value: name for name, value in SIGNALS.items()}
+    return {
+        'signal': signal_names[signal],
+        'sender': f'{sender.__module__}.{sender.__qualname__}',
+        'kwargs': {name: _encode(value) for name, value in kwargs.items()},
+    }
+
+
+def decode_events(events):
+    # Load every referenced instance with one query per model.
+    pks_by_model = defaultdict(set)
+    for event in events:
+        for value in event['kwargs'].values():
+            if isinstance(value, dict) and 'model' in value:
+                pks_by_model[value['model']].add(value['pk'])
+    instances = {
+        label: apps.get_model(label).objects.in_bulk(pks)
+        for label, pks in pks_by_model.items()
+    }
+
+    def decode(value):
+        if isinstance(value, dict) and 'model' in value:
+            return instances[value['model']].get(value['pk'])
+        return value
+
+    return [
+        (event, {name: decode(value) for name, value in event['kwargs'].items()})
+        for event in events
+    ]
+
+
+def _encode(value):
+    if isinstance(value, models.Model):
+        return {'model': value._meta.label_lower, 'pk': value.pk}
+    return value
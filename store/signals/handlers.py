@@ -1,10 +1,104 @@
 from django.conf import settings
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from ..models import Customer
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from .. import cache
+from ..customers import invalidate_customer
+from ..models import Cart, CartItem, Collection, Customer, Product, ProductImage
+from ..search import get_search_backend
+from ..tasks import generate_image_derivatives
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender , **kwargs):
     if kwargs['created'] :
         Customer.objects.create(user = kwargs['instance'])
 
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_cached_customer(sender, instance, **kwargs):
+    invalidate_customer(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    scopes = {
+        cache.PRODUCTS,
+        cache.product_scope(instance.pk),
+        cache.collection_scope(instance.collection_id),
+    }
+    previous_collection_id = getattr(instance, '_loaded_collection_id', None)
+    if previous_collection_id is not None:
+        scopes.add(cache.collection_scope(previous_collection_id))
+    cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    # Only the title and description are indexed.
+    if update_fields is not None and not update_fields & {'title', 'description'}:
+        return
+    get_search_backend().index([instance])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    # Images, including their derivatives, are part of the product's
+    # representation, so they move its Last-Modified. update() skips the
+    # product's own signals, which would re-index it for nothing.
+    product = Product.objects.filter(pk=instance.product_id)
+    product.update(last_update=timezone.now())
+    collection_id = product.values_list('collection_id', flat=True).first()
+    cache.bump(
+        cache.PRODUCTS,
+        cache.product_scope(instance.product_id),
+        cache.collection_scope(collection_id))
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= {'content_hash', 'derivatives'}:
+        return
+    transaction.on_commit(lambda: generate_image_derivatives.delay(instance.pk), robust=True)
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def invalidate_collection_cache(sender, instance, **kwargs):
+    cache.bump(cache.COLLECTIONS, cache.collection_scope(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def invalidate_cart_cache(sender, instance, **kwargs):
+    cache.bump(cache.cart_scope(instance.cart_id))
+
+
+@receiver(post_delete, sender=Cart)
+def invalidate_deleted_cart(sender, instance, **kwargs):
+    # An empty cart has no items whose deletion would bump its scope.
+    cache.bump(cache.cart_scope(instance.pk))
+
+
+def _add_to_products_count(collection_id, delta):
+    # Clamped at 0: a count that drifted low must not fail the CHECK
+    # constraint of the field and with it the save or delete.
+    Collection.objects.filter(pk=collection_id)\
+        .update(products_count=Greatest(F('products_count') + delta, Value(0)))
+    cache.bump(cache.COLLECTIONS)
+
+
+@receiver(post_save, sender=Product)
+def update_products_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        _add_to_products_count(instance.collection_id, 1)
+        return
+    previous_collection_id = getattr(instance, '_loaded_collection_id', None)
+    if previous_collection_id is not None and previous_collection_id != instance.collection_id:
+        _add_to_products_count(previous_collection_id, -1)
+        _add_to_products_count(instance.collection_id, 1)
+
+
+@receiver(post_delete, sender=Product)
+def update_products_count_on_delete(sender, instance, **kwargs):
+    _add_to_products_count(instance.collection_id, -1)
@@ -0,0 +1,49 @@
+import logging
+from celery import shared_task
+from django.utils.module_loading import import_string
+from . import jobs
+from .images import build_derivatives, get_content_hash
+from .models import ProductImage
+from .signals.dispatch import SIGNALS, decode_events
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=5)
+def dispatch_signals(self, events):
+    failed = []
+    for event, kwargs in decode_events(events):
+        sender = import_string(event['sender'])
+        responses = SIGNALS[event['signal']].send_robust(sender, **kwargs)
+        errors = [response for _, response in responses if isinstance(response, Exception)]
+        for error in errors:
+            logger.error('%s receiver failed', event['signal'], exc_info=error)
+        if errors:
+            failed.append(event)
+
+    # Receivers must be idempotent: a retried event is sent to every
+    # receiver again, including the ones that succeeded.
+    if failed:
+        raise self.retry(args=[failed], countdown=2 ** self.request.retries)
+
+
+@shared_task
+def generate_image_derivatives(image_id):
+    try:
+        product_image = ProductImage.objects.get(pk=image_id)
+    except ProductImage.DoesNotExist:
+        return
+    with product_image.image.open('rb') as file:
+        if not product_image.content_hash:
+            product_image.content_hash = get_content_hash(file)
+        product_image.derivatives = build_derivatives(file, product_image.content_hash)
+    # Saving sends post_save, which invalidates the cached products.
+    product_image.save(update_fields=['content_hash', 'derivatives'])
+
+
+@shared_task
+def run_admin_job(job_id):
+    # One chunk per run, so a long job does not hold a worker or a
+    # transaction for its whole duration.
+    if jobs.run_chunk(job_id):
+        run_admin_job.delay(job_id)
@@ -1,8 +1,21 @@
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from storefront20.celery import celery
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def celery_eager():
+    previous = celery.conf.task_always_eager
+    celery.conf.task_always_eager = True
+    yield
+    celery.conf.task_always_eager = previous
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -0,0 +1,187 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from store import jobs
+from store.models import AdminJob, AdminJobItem, Collection, Order, Product
+from store.pagination import EstimatedCountPaginator
+import pytest
+
+
+@pytest.fixture
+def paginator():
+    def make_paginator(threshold):
+        paginator = EstimatedCountPaginator(Product.objects.order_by('id'), 10)
+        paginator.threshold = threshold
+        return paginator
+    return make_paginator
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_if_below_threshold_counts_exactly(self, paginator):
+        baker.make(Product, _quantity=3)
+        paginator(threshold=10).count
+
+        baker.make(Product)
+
+        assert paginator(threshold=10).count == 4
+
+    def test_if_above_threshold_reuses_cached_count(self, paginator, django_assert_num_queries):
+        baker.make(Product, _quantity=3)
+        paginator(threshold=2).count
+
+        baker.make(Product)
+
+        with django_assert_num_queries(0):
+            assert paginator(threshold=2).count == 3
+
+
+@pytest.mark.django_db
+class TestPrefixSearch:
+    def test_if_full_title_is_searched_returns_product(self, admin_client):
+        baker.make(Product, title='Coffee beans')
+        baker.make(Product, title='Coffee cups')
+
+        response = admin_client.get('/admin/store/product/', {'q': 'coffee be'})
+
+        assert [product.title for product in response.context['cl'].result_list] == ['Coffee beans']
+
+    def test_if_collection_is_autocompleted_by_full_title_returns_it(self, admin_client):
+        collection = baker.make(Collection, title='Home appliances')
+        baker.make(Collection, title='Home office')
+
+        response = admin_client.get('/admin/autocomplete/', {
+            'term': 'home app', 'app_label': 'store', 'model_name': 'product', 'field_name': 'collection'})
+
+        assert [result['id'] for result in response.json()['results']] == [str(collection.id)]
+
+
+@pytest.mark.django_db
+class TestCustomerAdmin:
+    def test_if_searched_by_name_prefix_returns_matches(self, admin_client):
+        baker.make(settings.AUTH_USER_MODEL, first_name='Alice', last_name='Smith')
+        baker.make(settings.AUTH_USER_MODEL, first_name='Bob', last_name='Alison')
+        baker.make(settings.AUTH_USER_MODEL, first_name='Carol', last_name='Jones')
+
+        response = admin_client.get('/admin/store/customer/', {'q': 'ali'})
+
+        names = sorted(str(customer) for customer in response.context['cl'].result_list)
+        assert names == ['Alice Smith', 'Bob Alison']
+
+    def test_if_searched_by_full_name_returns_match(self, admin_client):
+        baker.make(settings.AUTH_USER_MODEL, first_name='Alice', last_name='Smith')
+        baker.make(settings.AUTH_USER_MODEL, first_name='Alice', last_name='Jones')
+
+        response = admin_client.get('/admin/store/customer/', {'q': 'alice smi'})
+
+        assert [str(customer) for customer in response.context['cl'].result_list] == ['Alice Smith']
+
+    def test_if_listed_counts_orders_without_grouping(self, admin_client):
+        user = baker.make(settings.AUTH_USER_MODEL, first_name='Alice')
+        baker.make(Order, customer=user.customer, _quantity=2)
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get('/admin/store/customer/', {'q': 'alice'})
+
+        [customer] = response.context['cl'].result_list
+        assert customer.orders_count == 2
+        assert not any('GROUP BY "store_customer"' in query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestOrderAdmin:
+    def test_if_listed_query_count_does_not_grow_with_orders(self, admin_client):
+        query_counts = []
+        for _ in range(2):
+            baker.make(Order, customer=baker.make(settings.AUTH_USER_MODEL).customer, _quantity=3)
+
+            with CaptureQueriesContext(connection) as context:
+                admin_client.get('/admin/store/order/')
+            query_counts.append(len(context.captured_queries))
+
+        assert query_counts[0] == query_counts[1]
+
+
+@pytest.fixture
+def run_action(admin_client, celery_eager, django_capture_on_commit_callbacks, monkeypatch):
+    def do_run_action(action, products, **data):
+        monkeypatch.setattr(jobs, 'CHUNK_SIZE', 2)
+        with django_capture_on_commit_callbacks(execute=True):
+            return admin_client.post('/admin/store/product/', {
+                'action': action,
+                '_selected_action': [product.id for product in products],
+                **data,
+            })
+    return do_run_action
+
+
+@pytest.mark.django_db
+class TestProductJobs:
+    def test_if_inventory_is_cleared_runs_job_in_chunks(self, run_action):
+        products = baker.make(Product, inventory=5, _quantity=5)
+
+        run_action('clear_inventory', products)
+
+        job = AdminJob.objects.get()
+        assert job.status == AdminJob.STATUS_DONE
+        assert (job.total, job.processed, job.updated) == (5, 5, 5)
+        assert job.last_object_id == max(product.id for product in products)
+        assert not job.items.exists()
+        assert not Product.objects.exclude(inventory=0).exists()
+
+    def test_if_job_is_started_copies_selection_in_one_query(self, monkeypatch, django_capture_on_commit_callbacks):
+        monkeypatch.setattr(jobs, 'CHUNK_SIZE', 2)
+        products = baker.make(Product, inventory=5, _quantity=5)
+        baker.make(Product, inventory=50)
+
+        with CaptureQueriesContext(connection) as context:
+            with django_capture_on_commit_callbacks():
+                job = jobs.start_job('clear_inventory', Product.objects.filter(inventory__lt=10), 'Clear inventory')
+
+        inserts = [query for query in context.captured_queries if 'store_adminjobitem' in query['sql']]
+        assert len(inserts) == 1
+        assert job.total == 5
+        assert set(job.items.values_list('object_id', flat=True)) == {product.id for product in products}
+
+    def test_if_prices_are_adjusted_updates_prices_with_tax(self, run_action):
+        products = baker.make(Product, unit_price=Decimal('10.00'), _quantity=3)
+
+        run_action('adjust_prices', products, percent='10')
+
+        assert AdminJob.objects.get().status == AdminJob.STATUS_DONE
+        assert set(Product.objects.values_list('unit_price', 'price_with_tax')) == \
+            {(Decimal('11.00'), Decimal('12.10'))}
+
+    def test_if_percent_is_missing_starts_no_job(self, run_action):
+        products = baker.make(Product, unit_price=Decimal('10.00'), _quantity=1)
+
+        run_action('adjust_prices', products)
+
+        assert not AdminJob.objects.exists()
+        assert Product.objects.get().unit_price == Decimal('10.00')
+
+    def test_if_action_fails_records_error(self, monkeypatch):
+        def fail(ids, params):
+            raise ValueError('boom')
+        monkeypatch.setitem(jobs.ACTIONS, 'fail', fail)
+        job = baker.make(AdminJob, action='fail', total=1)
+        baker.make(AdminJobItem, job=job, object_id=1)
+
+        with pytest.raises(ValueError):
+            jobs.run_chunk(job.id)
+
+        job.refresh_from_db()
+        assert job.status == AdminJob.STATUS_FAILED
+        assert job.error == 'boom'
+
+    def test_if_job_is_viewed_shows_progress(self, admin_client):
+        job = baker.make(AdminJob, description='Clear inventory', total=4, processed=1,
+                         status=AdminJob.STATUS_RUNNING)
+
+        response = admin_client.get(f'/admin/store/adminjob/{job.id}/change/')
+
+        assert response.status_code == 200
+        assert response['Refresh'] == '2'
+        assert b'1/4 (25%)' in response.content
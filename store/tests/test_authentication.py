@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from core.authentication import LazyUser
+from likes.models import LikedItem
+from store.models import Product
+import pytest
+
+
+@pytest.fixture
+def user():
+    user = baker.make(get_user_model(), username='a', email='a@domain.com')
+    user.set_password('secret')
+    user.save()
+    return user
+
+@pytest.fixture
+def obtain_tokens(api_client):
+    def do_obtain_tokens(user):
+        response = api_client.post('/auth/jwt/create/', {'username': user.username, 'password': 'secret'})
+        return response.data
+    return do_obtain_tokens
+
+
+@pytest.mark.django_db
+class TestStatelessJWT:
+    def test_if_token_is_obtained_returns_claims(self, obtain_tokens, user):
+        tokens = obtain_tokens(user)
+
+        access = AccessToken(tokens['access'])
+        assert access['customer_id'] == user.customer.id
+        assert access['is_staff'] is False
+        assert 'pv' in access
+
+    def test_if_authenticated_does_not_load_user(self, api_client, obtain_tokens, user):
+        tokens = obtain_tokens(user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens["access"]}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'core_user' not in tables
+        assert 'store_customer' not in tables
+
+    def test_if_other_field_is_read_loads_user(self, obtain_tokens, user, django_assert_num_queries):
+        lazy_user = LazyUser(AccessToken(obtain_tokens(user)['access']))
+
+        with django_assert_num_queries(1):
+            assert lazy_user.email == 'a@domain.com'
+            assert lazy_user.username == 'a'
+
+    def test_if_user_is_made_staff_revokes_tokens(self, api_client, obtain_tokens, user):
+        tokens = obtain_tokens(user)
+
+        user.is_staff = True
+        user.save()
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens["access"]}')
+        response = api_client.get('/store/orders/')
+        refresh = api_client.post('/auth/jwt/refresh/', {'refresh': tokens['refresh']})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert refresh.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_user_is_deleted_revokes_tokens(self, api_client, obtain_tokens, user):
+        user.is_staff = True
+        user.save()
+        tokens = obtain_tokens(user)
+
+        user.delete()
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens["access"]}')
+        response = api_client.get('/store/customers/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_name_changes_keeps_tokens(self, api_client, obtain_tokens, user):
+        tokens = obtain_tokens(user)
+
+        user.first_name = 'b'
+        user.save()
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens["access"]}')
+        response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.fixture
+def jwt_client(api_client, obtain_tokens, user):
+    # A real Authorization header: force_authenticate would skip
+    # StatelessJWTAuthentication altogether.
+    api_client.credentials(HTTP_AUTHORIZATION=f'JWT {obtain_tokens(user)["access"]}')
+    return api_client
+
+
+@pytest.mark.django_db
+class TestLazyUserWrites:
+    def test_if_product_is_liked_and_unliked_stores_like(self, jwt_client, user, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            liked = jwt_client.post(f'/store/products/{product.id}/like/')
+        assert liked.status_code == status.HTTP_201_CREATED
+        assert LikedItem.objects.get().user_id == user.id
+
+        with django_capture_on_commit_callbacks(execute=True):
+            unliked = jwt_client.delete(f'/store/products/{product.id}/like/')
+        assert unliked.status_code == status.HTTP_204_NO_CONTENT
+        assert not LikedItem.objects.exists()
+
+    def test_if_me_is_updated_saves_user(self, jwt_client, user):
+        response = jwt_client.patch('/auth/users/me/', {'first_name': 'b'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['first_name'] == 'b'
+        assert get_user_model().objects.get(pk=user.pk).first_name == 'b'
+
+    def test_if_attribute_is_set_sets_it_on_user(self, obtain_tokens, user):
+        lazy_user = LazyUser(AccessToken(obtain_tokens(user)['access']))
+
+        lazy_user.is_staff = True
+        lazy_user.save()
+
+        assert lazy_user.is_staff is True
+        assert isinstance(lazy_user, get_user_model())
+        assert get_user_model().objects.get(pk=user.pk).is_staff is True
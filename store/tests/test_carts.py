@@ -0,0 +1,179 @@
+from django.conf import settings
+from decimal import Decimal
+from store.models import Cart, CartItem, Product
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+
+@pytest.fixture
+def retrieve_cart(api_client):
+    def do_retrieve_cart(cart):
+        return api_client.get(f'/store/carts/{cart.id}/')
+    return do_retrieve_cart
+
+
+@pytest.mark.django_db
+class TestCreateCart:
+    def test_if_cart_is_created_returns_201(self, api_client):
+        response = api_client.post('/store/carts/')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['items'] == []
+        assert response.data['cart_total_price'] == 0
+
+
+@pytest.mark.django_db
+class TestRetrieveCart:
+    def test_if_cart_does_not_exist_returns_404(self, api_client):
+        response = api_client.get('/store/carts/00000000-0000-0000-0000-000000000000/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cart_has_items_returns_totals(self, retrieve_cart):
+        cart = baker.make(Cart)
+        first = baker.make(CartItem, cart=cart, quantity=2, product__unit_price=Decimal('10.50'))
+        baker.make(CartItem, cart=cart, quantity=3, product__unit_price=Decimal('1.25'))
+
+        response = retrieve_cart(cart)
+
+        assert response.status_code == status.HTTP_200_OK
+        totals = {item['id']: item['total_price'] for item in response.data['items']}
+        assert totals[first.id] == Decimal('21.00')
+        assert response.data['cart_total_price'] == Decimal('24.75')
+
+    @pytest.mark.parametrize('items_count', [1, 10, 100])
+    def test_if_cart_is_retrieved_runs_three_queries(self, retrieve_cart, django_assert_num_queries, items_count):
+        cart = baker.make(Cart)
+        for product in baker.make(Product, _quantity=items_count):
+            baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+        # ETag lookup, cart with its total, items with their products
+        with django_assert_num_queries(3):
+            response = retrieve_cart(cart)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['items']) == items_count
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_if_product_is_new_creates_item(self, api_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/',
+                                   {'product_id': product.id, 'quantity': 2})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['quantity'] == 2
+
+    def test_if_product_is_in_cart_increments_quantity(self, api_client):
+        cart = baker.make(Cart)
+        item = baker.make(CartItem, cart=cart, quantity=3)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/',
+                                   {'product_id': item.product_id, 'quantity': 2})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['id'] == item.id
+        assert response.data['quantity'] == 5
+
+    def test_if_product_does_not_exist_returns_400(self, api_client):
+        cart = baker.make(Cart)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/',
+                                   {'product_id': -1, 'quantity': 1})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestBulkAddCartItems:
+    def test_if_items_are_valid_upserts_all(self, api_client):
+        cart = baker.make(Cart)
+        existing = baker.make(CartItem, cart=cart, quantity=1)
+        new_product = baker.make(Product)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/bulk/', [
+            {'product_id': existing.product_id, 'quantity': 2},
+            {'product_id': new_product.id, 'quantity': 1},
+            {'product_id': new_product.id, 'quantity': 3},
+        ], format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        quantities = {item['product']['id']: item['quantity'] for item in response.data}
+        assert quantities == {existing.product_id: 3, new_product.id: 4}
+
+    def test_if_a_product_does_not_exist_returns_400(self, api_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/bulk/', [
+            {'product_id': product.id, 'quantity': 1},
+            {'product_id': -1, 'quantity': 1},
+        ], format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert CartItem.objects.count() == 0
+
+    def test_if_list_is_empty_returns_400(self, api_client):
+        cart = baker.make(Cart)
+
+        response = api_client.post(f'/store/carts/{cart.id}/items/bulk/', [], format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestConditionalRetrieveCart:
+    def test_if_etag_matches_returns_304(self, api_client, retrieve_cart):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1)
+        etag = retrieve_cart(cart)['ETag']
+
+        response = api_client.get(f'/store/carts/{cart.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_cart_is_deleted_returns_404(self, api_client, retrieve_cart):
+        cart = baker.make(Cart)
+        etag = retrieve_cart(cart)['ETag']
+
+        api_client.delete(f'/store/carts/{cart.id}/')
+        response = api_client.get(f'/store/carts/{cart.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cart_is_checked_out_returns_404(self, api_client, retrieve_cart):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, product__inventory=5)
+        etag = retrieve_cart(cart)['ETag']
+
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        api_client.post('/store/orders/', {'cart_id': str(cart.id)})
+        response = api_client.get(f'/store/carts/{cart.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_item_is_added_etag_changes(self, api_client, retrieve_cart):
+        cart = baker.make(Cart)
+        etag = retrieve_cart(cart)['ETag']
+        product = baker.make(Product)
+
+        api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 1})
+        response = api_client.get(f'/store/carts/{cart.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_if_product_price_changes_etag_changes(self, api_client, retrieve_cart):
+        cart = baker.make(Cart)
+        item = baker.make(CartItem, cart=cart, quantity=1)
+        etag = retrieve_cart(cart)['ETag']
+
+        item.product.unit_price += 1
+        item.product.save()
+        response = api_client.get(f'/store/carts/{cart.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
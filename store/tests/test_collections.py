@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from store.models import Collection, Product
 from rest_framework import status
 #from django.db.models.aggregates import Count
@@ -164,3 +165,92 @@ class TestUpdateCollection:
         
         
 
+
+
+@pytest.mark.django_db
+class TestCollectionProductsCount:
+    def test_if_products_are_added_returns_count(self, api_client):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=3)
+
+        response = api_client.get(f'/store/collections/{collection.id}/')
+
+        assert response.data['products_count'] == 3
+
+    def test_if_product_is_moved_updates_both_counts(self):
+        old_collection, new_collection = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=old_collection)
+
+        product = Product.objects.get(pk=product.pk)
+        product.collection = new_collection
+        product.save()
+
+        old_collection.refresh_from_db()
+        new_collection.refresh_from_db()
+        assert old_collection.products_count == 0
+        assert new_collection.products_count == 1
+
+    def test_if_product_is_deleted_decrements_count(self):
+        collection = baker.make(Collection)
+        product = baker.make(Product, collection=collection)
+
+        product.delete()
+
+        collection.refresh_from_db()
+        assert collection.products_count == 0
+
+    def test_if_count_drifted_to_zero_product_can_be_deleted(self, api_client, authenticate):
+        collection = baker.make(Collection)
+        product = baker.make(Product, collection=collection)
+        Collection.objects.update(products_count=0)
+        authenticate(is_staff=True)
+
+        response = api_client.delete(f'/store/products/{product.id}/')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        collection.refresh_from_db()
+        assert collection.products_count == 0
+
+    def test_if_count_drifted_reconcile_fixes_it(self):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.update(products_count=7)
+
+        Collection.objects.reconcile_products_count()
+
+        collection.refresh_from_db()
+        assert collection.products_count == 2
+
+
+    def test_if_count_drifted_reconcile_command_invalidates_etag(self, api_client, django_capture_on_commit_callbacks):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.update(products_count=7)
+        etag = api_client.get(f'/store/collections/{collection.id}/')['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command('reconcile_products_count')
+        response = api_client.get(f'/store/collections/{collection.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['products_count'] == 2
+
+@pytest.mark.django_db
+class TestConditionalListCollections:
+    def test_if_etag_matches_returns_304(self, api_client):
+        baker.make(Collection)
+        etag = api_client.get('/store/collections/')['ETag']
+
+        response = api_client.get('/store/collections/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_product_is_added_returns_200(self, api_client):
+        collection = baker.make(Collection)
+        etag = api_client.get('/store/collections/')['ETag']
+
+        baker.make(Product, collection=collection)
+        response = api_client.get('/store/collections/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['products_count'] == 1
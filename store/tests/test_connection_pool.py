@@ -0,0 +1,64 @@
+from storefront20.db.pool import ConnectionMetrics, ConnectionPool, PoolTimeout
+import pytest
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def make_pool():
+    def do_make_pool(is_usable=lambda connection: True, **options):
+        return ConnectionPool(FakeConnection, is_usable, **options)
+    return do_make_pool
+
+
+class TestConnectionPool:
+    def test_if_connection_is_released_reuses_it(self, make_pool):
+        pool = make_pool()
+        connection = pool.get()
+
+        pool.put(connection)
+
+        assert pool.get() is connection
+
+    def test_if_pool_is_exhausted_raises_timeout(self, make_pool):
+        pool = make_pool(max_size=1, timeout=0.01)
+        pool.get()
+
+        with pytest.raises(PoolTimeout):
+            pool.get()
+
+    def test_if_connection_is_discarded_frees_its_slot(self, make_pool):
+        pool = make_pool(max_size=1, timeout=0.01)
+        connection = pool.get()
+
+        pool.put(connection, discard=True)
+
+        assert connection.closed
+        assert pool.get() is not connection
+
+    def test_if_idle_connection_is_unusable_replaces_it(self, make_pool):
+        pool = make_pool(is_usable=lambda connection: False, check_after=0)
+        connection = pool.get()
+        pool.put(connection)
+
+        assert pool.get() is not connection
+        assert connection.closed
+
+
+class TestConnectionMetrics:
+    def test_if_recorded_returns_percentiles(self):
+        metrics = ConnectionMetrics()
+
+        for milliseconds in range(1, 101):
+            metrics.record(milliseconds / 1000)
+
+        snapshot = metrics.snapshot()
+        assert snapshot['count'] == 100
+        assert snapshot['p50'] == pytest.approx(51)
+        assert snapshot['p99'] == pytest.approx(100)
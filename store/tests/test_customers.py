@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+from store.models import Cart, CartItem
+import pytest
+
+
+@pytest.fixture
+def user(api_client):
+    user = baker.make(settings.AUTH_USER_MODEL)
+    api_client.force_authenticate(user=user)
+    return user
+
+def count_customer_queries(context):
+    return sum('"store_customer"' in query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestRequestCustomer:
+    def test_if_me_is_read_twice_loads_customer_once(self, api_client, user):
+        with CaptureQueriesContext(connection) as context:
+            first = api_client.get('/store/customers/me/')
+            second = api_client.get('/store/customers/me/')
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+        assert second.data['id'] == user.customer.id
+        assert count_customer_queries(context) == 1
+
+    def test_if_me_is_updated_returns_new_values(self, api_client, user):
+        api_client.get('/store/customers/me/')
+
+        api_client.put('/store/customers/me/', {'phone': '555', 'membership': 'G'})
+        response = api_client.get('/store/customers/me/')
+
+        assert response.data['phone'] == '555'
+        assert response.data['membership'] == 'G'
+
+    def test_if_order_is_placed_loads_customer_once(self, api_client, user):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, product__inventory=5)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post('/store/orders/', {'cart_id': str(cart.id)})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert count_customer_queries(context) == 1
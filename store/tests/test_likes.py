@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from likes import counters
+from likes.models import LikeCounter, LikedItem
+from likes.tasks import flush_like_counters
+from model_bakery import baker
+from rest_framework import status
+from store.models import Product
+import pytest
+
+
+@pytest.fixture
+def like_product(api_client, django_capture_on_commit_callbacks):
+    def do_like_product(product, method='post'):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        api_client.force_authenticate(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            return getattr(api_client, method)(f'/store/products/{product.id}/like/')
+    return do_like_product
+
+
+@pytest.mark.django_db
+class TestLikeProduct:
+    def test_if_liked_twice_stores_one_like(self, api_client, like_product, django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+
+        first = like_product(product)
+        with django_capture_on_commit_callbacks(execute=True):
+            second = api_client.post(f'/store/products/{product.id}/like/')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_200_OK
+        assert LikedItem.objects.count() == 1
+        liked_item = LikedItem.objects.get()
+        with pytest.raises(IntegrityError):
+            LikedItem.objects.create(user=liked_item.user, content_object=product)
+
+    def test_if_user_is_anonymous_returns_401(self, api_client):
+        product = baker.make(Product)
+
+        response = api_client.post(f'/store/products/{product.id}/like/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestLikeCounters:
+    def test_if_flushed_counts_are_read_from_counter_table(self, api_client, like_product,
+            django_capture_on_commit_callbacks):
+        product = baker.make(Product)
+        for _ in range(3):
+            like_product(product)
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.delete(f'/store/products/{product.id}/like/')
+
+        assert LikedItem.objects.like_counts_for(Product, [product.id]) == {}
+        assert flush_like_counters() == 1
+        assert LikedItem.objects.like_counts_for(Product, [product.id]) == {product.id: 2}
+
+    def test_if_flushed_again_adds_new_likes(self, like_product):
+        product = baker.make(Product)
+        like_product(product)
+        flush_like_counters()
+
+        like_product(product)
+        flush_like_counters()
+
+        assert LikeCounter.objects.get().count == 2
+        assert flush_like_counters() == 0
+
+    def test_if_flush_runs_while_slot_is_written_like_is_not_lost(self, monkeypatch):
+        product = baker.make(Product)
+        content_type = ContentType.objects.get_for_model(Product)
+        incr = counters._incr
+
+        def incr_then_flush(key, delta):
+            value = incr(key, delta)
+            if key == 'likes:journal:end' and value == 1:
+                # The flush runs between allocating the slot and writing it.
+                counters.flush()
+            return value
+        monkeypatch.setattr(counters, '_incr', incr_then_flush)
+
+        counters.record(content_type.id, product.id, 1)
+        counters.flush()
+
+        assert LikeCounter.objects.get().count == 1
+
+    def test_if_flush_is_running_reconcile_fails(self, like_product):
+        with counters.flush_lock():
+            with pytest.raises(CommandError):
+                call_command('reconcile_like_counters')
+
+    def test_if_counters_drift_reconcile_recounts(self, like_product):
+        products = baker.make(Product, _quantity=2)
+        like_product(products[0])
+        flush_like_counters()
+        LikeCounter.objects.update(count=10)
+        like_product(products[1])
+        baker.make(LikedItem, content_object=products[1])
+
+        call_command('reconcile_like_counters')
+
+        counts = LikedItem.objects.like_counts_for(Product, [p.id for p in products])
+        assert counts == {products[0].id: 1, products[1].id: 2}
@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.core.cache import cache
+from decimal import Decimal
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from store.models import Cart, CartItem, Order, OrderItem, Product
+from store.signals import dispatch, order_created
+from store.tasks import dispatch_signals
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+
+@pytest.fixture
+def authenticate_customer(api_client):
+    def do_authenticate_customer():
+        user = baker.make(settings.AUTH_USER_MODEL)
+        api_client.force_authenticate(user=user)
+        return user
+    return do_authenticate_customer
+
+@pytest.fixture
+def place_order(api_client):
+    def do_place_order(cart):
+        return api_client.post('/store/orders/', {'cart_id': str(cart.id)})
+    return do_place_order
+
+
+@pytest.mark.django_db
+class TestPlaceOrder:
+    def test_if_user_is_anonymous_returns_401(self, place_order):
+        cart = baker.make(Cart)
+
+        response = place_order(cart)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_cart_is_empty_returns_400(self, authenticate_customer, place_order):
+        authenticate_customer()
+        cart = baker.make(Cart)
+
+        response = place_order(cart)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['cart_id'] is not None
+
+    def test_if_cart_is_valid_creates_order_and_decrements_inventory(self, authenticate_customer, place_order):
+        user = authenticate_customer()
+        cart = baker.make(Cart)
+        item = baker.make(CartItem, cart=cart, quantity=3, product__inventory=5)
+
+        response = place_order(cart)
+
+        assert response.status_code == status.HTTP_200_OK
+        order = Order.objects.get(pk=response.data['id'])
+        assert order.customer_id == user.customer.id
+        assert order.items.get().quantity == 3
+        assert Product.objects.get(pk=item.product_id).inventory == 2
+        assert not Cart.objects.filter(pk=cart.id).exists()
+
+    def test_if_product_is_oversold_returns_400(self, authenticate_customer, place_order):
+        authenticate_customer()
+        cart = baker.make(Cart)
+        item = baker.make(CartItem, cart=cart, quantity=3, product__inventory=2)
+
+        response = place_order(cart)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Order.objects.count() == 0
+        assert Product.objects.get(pk=item.product_id).inventory == 2
+        assert CartItem.objects.filter(cart=cart).exists()
+
+    def test_if_cart_grows_query_count_does_not(self, authenticate_customer, place_order):
+        authenticate_customer()
+        query_counts = []
+        for items_count in [1, 20]:
+            cart = baker.make(Cart)
+            for product in baker.make(Product, inventory=10, _quantity=items_count):
+                baker.make(CartItem, cart=cart, product=product, quantity=1)
+            # Compare checkouts that both resolve the customer from the database.
+            cache.clear()
+
+            with CaptureQueriesContext(connection) as context:
+                response = place_order(cart)
+
+            assert response.status_code == status.HTTP_200_OK
+            query_counts.append(len(context.captured_queries))
+
+        assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    def test_if_user_is_customer_returns_own_orders_with_totals(self, api_client, authenticate_customer):
+        user = authenticate_customer()
+        order = baker.make(Order, customer=user.customer)
+        baker.make(OrderItem, order=order, quantity=2, unit_price=Decimal('1.50'))
+        baker.make(OrderItem, order=order, quantity=1, unit_price=Decimal('4.00'))
+        other_user = baker.make(settings.AUTH_USER_MODEL)
+        baker.make(Order, customer=other_user.customer)
+
+        response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+        result = response.data['results'][0]
+        assert result['order_total_price'] == Decimal('7.00')
+        assert sorted(item['total_price'] for item in result['items']) == [Decimal('3.00'), Decimal('4.00')]
+
+    def test_if_fields_exclude_items_skips_loading_them(self, api_client, authenticate_customer,
+            django_assert_num_queries):
+        user = authenticate_customer()
+        order = baker.make(Order, customer=user.customer)
+        baker.make(OrderItem, order=order, quantity=1, unit_price=Decimal('2.00'))
+
+        # customer, count, orders page
+        with django_assert_num_queries(3):
+            response = api_client.get('/store/orders/', {'fields': 'id,order_total_price'})
+
+        assert response.data['results'] == [{'id': order.id, 'order_total_price': Decimal('2.00')}]
+
+
+@pytest.fixture
+def order_created_receiver():
+    received = []
+    def receiver(sender, **kwargs):
+        received.append(kwargs['order'])
+    order_created.connect(receiver)
+    yield received
+    order_created.disconnect(receiver)
+
+
+@pytest.mark.django_db
+class TestOrderCreatedSignal:
+    def test_if_order_is_placed_receivers_run_after_commit(self, authenticate_customer, place_order,
+            celery_eager, order_created_receiver, django_capture_on_commit_callbacks):
+        authenticate_customer()
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, product__inventory=1)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = place_order(cart)
+            assert order_created_receiver == []
+
+        for callback in callbacks:
+            callback()
+        assert [order.id for order in order_created_receiver] == [response.data['id']]
+
+    def test_if_broker_is_down_order_is_still_placed(self, authenticate_customer, place_order,
+            monkeypatch, django_capture_on_commit_callbacks):
+        def fail(*args, **kwargs):
+            raise ConnectionError('broker is down')
+        monkeypatch.setattr(dispatch_signals, 'delay', fail)
+        authenticate_customer()
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, product__inventory=1)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = place_order(cart)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.count() == 1
+
+    def test_if_events_share_a_transaction_they_are_batched(self, celery_eager,
+            order_created_receiver, django_capture_on_commit_callbacks):
+        user = baker.make(settings.AUTH_USER_MODEL)
+        orders = baker.make(Order, customer=user.customer, _quantity=2)
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for order in orders:
+                    dispatch.send(order_created, Order, order=order)
+
+        assert len(callbacks) == 1
+        assert order_created_receiver == orders
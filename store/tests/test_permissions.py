@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from model_bakery import baker
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from core.authentication import LazyUser, add_claims
+import pytest
+
+
+@pytest.fixture
+def user():
+    return baker.make(get_user_model())
+
+@pytest.fixture
+def group():
+    group = baker.make(Group)
+    group.permissions.add(Permission.objects.get(codename='view_history'))
+    return group
+
+@pytest.fixture
+def get_history(api_client, user):
+    def do_get_history():
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {add_claims(AccessToken.for_user(user), user)}')
+        return api_client.get(f'/store/customers/{user.customer.id}/history/')
+    return do_get_history
+
+
+@pytest.mark.django_db
+class TestPermissionCache:
+    def test_if_permission_is_cached_checks_without_queries(self, user, group, django_assert_num_queries):
+        user.groups.add(group)
+        get_user_model().objects.get(pk=user.pk).has_perm('store.view_history')
+        lazy_user = LazyUser(add_claims(AccessToken.for_user(user), user))
+
+        with django_assert_num_queries(0):
+            assert lazy_user.has_perm('store.view_history')
+            assert lazy_user.has_perms(['store.view_history'])
+            assert lazy_user.has_module_perms('store')
+
+    def test_if_user_has_group_permission_returns_200(self, user, group, get_history):
+        user.groups.add(group)
+
+        response = get_history()
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_user_leaves_group_returns_403(self, user, group, get_history):
+        user.groups.add(group)
+        get_history()
+
+        user.groups.remove(group)
+        response = get_history()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_group_loses_permission_returns_403(self, user, group, get_history):
+        user.groups.add(group)
+        get_history()
+
+        group.permissions.clear()
+        response = get_history()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_group_is_deleted_returns_403(self, user, group, get_history):
+        user.groups.add(group)
+        get_history()
+
+        group.delete()
+        response = get_history()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_user_is_given_permission_returns_200(self, user, get_history):
+        get_history()
+
+        user.user_permissions.add(Permission.objects.get(codename='view_history'))
+        response = get_history()
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_superuser_is_demoted_loses_permissions(self, user):
+        user.is_superuser = True
+        user.save()
+        get_user_model().objects.get(pk=user.pk).get_all_permissions()
+
+        user = get_user_model().objects.get(pk=user.pk)
+        user.is_superuser = False
+        user.save()
+
+        assert not get_user_model().objects.get(pk=user.pk).has_perm('store.view_history')
@@ -0,0 +1,92 @@
+from io import BytesIO
+import hashlib
+import os
+from django.core.files.uploadedfile import SimpleUploadedFile
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+from store.models import Product, ProductImage
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+@pytest.fixture
+def upload_image(api_client, django_capture_on_commit_callbacks):
+    def do_upload_image(product, image=None):
+        output = BytesIO()
+        (image or Image.new('RGB', (1200, 800), 'red')).save(output, 'PNG')
+        upload = SimpleUploadedFile('photo.png', output.getvalue(), content_type='image/png')
+        with django_capture_on_commit_callbacks(execute=True):
+            return api_client.post(f'/store/products/{product.id}/images/', {'image': upload})
+    return do_upload_image
+
+
+@pytest.mark.django_db
+class TestImageDerivatives:
+    def test_if_image_is_uploaded_generates_webp_derivatives(self, upload_image, celery_eager, media_root):
+        product = baker.make(Product)
+
+        response = upload_image(product)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        product_image = ProductImage.objects.get(pk=response.data['id'])
+        assert len(product_image.content_hash) == 64
+        with Image.open(media_root / product_image.derivatives['thumb']) as thumb:
+            assert thumb.format == 'WEBP'
+            assert thumb.size == (160, 107)
+
+    def test_if_same_image_is_uploaded_twice_stores_derivatives_once(self, upload_image, celery_eager, media_root):
+        product = baker.make(Product)
+
+        upload_image(product)
+        upload_image(product)
+
+        first, second = ProductImage.objects.all()
+        assert first.derivatives == second.derivatives
+        assert len(list((media_root / 'store/images/derivatives').glob('*/*/*.webp'))) == 2
+
+    @pytest.mark.parametrize('size', ['thumb', 'medium'])
+    def test_if_size_is_requested_returns_derivative_url(self, api_client, upload_image, celery_eager, size):
+        product = baker.make(Product)
+        upload_image(product)
+
+        detail = api_client.get(f'/store/products/{product.id}/', {'image_size': size})
+        listing = api_client.get('/store/products/', {'image_size': size})
+
+        assert detail.data['images'][0]['image'].endswith(f'/{size}.webp')
+        assert listing.data['results'][0]['images'] == detail.data['images']
+
+    def test_if_size_is_full_returns_original_url(self, api_client, upload_image, celery_eager):
+        product = baker.make(Product)
+        upload_image(product)
+
+        response = api_client.get(f'/store/products/{product.id}/', {'image_size': 'full'})
+
+        assert response.data['images'][0]['image'].endswith('.png')
+
+
+@pytest.mark.django_db
+class TestUploadImage:
+    def test_if_image_is_too_large_returns_400(self, upload_image, media_root):
+        product = baker.make(Product)
+        noise = Image.frombytes('RGB', (600, 600), os.urandom(600 * 600 * 3))
+
+        response = upload_image(product, noise)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['image'] == ['Files cannot be larger than 500KB!']
+        assert not ProductImage.objects.exists()
+        assert not list(media_root.rglob('*.png'))
+
+    def test_if_image_is_uploaded_stores_content_hash(self, upload_image, celery_eager, media_root):
+        product = baker.make(Product)
+
+        response = upload_image(product)
+
+        product_image = ProductImage.objects.get(pk=response.data['id'])
+        content = (media_root / product_image.image.name).read_bytes()
+        assert product_image.content_hash == hashlib.sha256(content).hexdigest()
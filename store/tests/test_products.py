@@ -1,9 +1,24 @@
-from store.models import Customer, Order, OrderItem, Product , Collection
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from store.fastpath import compile_serializer
+from store.models import Customer, Order, OrderItem, Product , Collection, ProductImage
+from store.serializers import CollectionSerializer, ProductSerializer
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from django.db.models.aggregates import Count
+from likes.models import LikeCounter
 from model_bakery import baker
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from tags.models import Tag, TaggedItem
 import pytest
 
 
@@ -188,3 +203,460 @@ class TestUpdateProduct:
         assert response.data['id'] == product.id
         assert response.data['title'] == 'a'
         assert response.data['unit_price'] == 13
+
+
+@pytest.mark.django_db
+class TestListProducts:
+    def test_if_page_number_is_used_returns_count(self, api_client):
+        baker.make(Product, _quantity=12)
+
+        response = api_client.get('/store/products/', {'page': 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 12
+        assert len(response.data['results']) == 2
+
+    def test_if_keyset_is_requested_returns_cursor_page(self, api_client):
+        baker.make(Product, _quantity=12)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get('/store/products/', {'pagination': 'keyset'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 10
+        assert not any('COUNT(' in query['sql'] for query in context.captured_queries)
+
+    def test_if_cursor_is_followed_returns_next_page(self, api_client):
+        baker.make(Product, _quantity=12)
+
+        first = api_client.get('/store/products/', {'pagination': 'keyset', 'ordering': '-unit_price'})
+        second = api_client.get(first.data['next'])
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data['next'] is None
+        results = first.data['results'] + second.data['results']
+        assert {p['id'] for p in results} == set(Product.objects.values_list('id', flat=True))
+        prices = [p['unit_price'] for p in results]
+        assert prices == sorted(prices, reverse=True)
+
+    def test_if_values_tie_pages_do_not_skip_or_repeat(self, api_client):
+        products = baker.make(Product, unit_price=Decimal('5.00'), _quantity=25)
+
+        ids = []
+        response = api_client.get('/store/products/', {'pagination': 'keyset', 'ordering': 'unit_price'})
+        with CaptureQueriesContext(connection) as context:
+            while True:
+                ids += [p['id'] for p in response.data['results']]
+                if response.data['next'] is None:
+                    break
+                response = api_client.get(response.data['next'])
+
+        assert ids == sorted(product.id for product in products)
+        assert not any('OFFSET' in query['sql'] for query in context.captured_queries)
+
+    def test_if_previous_is_followed_returns_previous_page(self, api_client):
+        baker.make(Product, unit_price=Decimal('5.00'), _quantity=15)
+        baker.make(Product, unit_price=Decimal('7.00'), _quantity=10)
+
+        first = api_client.get('/store/products/', {'pagination': 'keyset', 'ordering': '-unit_price'})
+        second = api_client.get(first.data['next'])
+        previous = api_client.get(second.data['previous'])
+
+        assert previous.data['results'] == first.data['results']
+        assert previous.data['previous'] is None
+
+    def test_if_cursor_is_invalid_returns_404(self, api_client):
+        # p=["x","1"], not a price
+        response = api_client.get('/store/products/', {'ordering': 'unit_price', 'cursor': 'cD1bIngiLCIxIl0='})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestProductResponseCache:
+    def test_if_product_is_cached_returns_without_queries(self, api_client, django_assert_num_queries):
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        with django_assert_num_queries(0):
+            response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == product.id
+
+    def test_if_scheme_differs_links_keep_their_scheme(self, api_client):
+        baker.make(Product, _quantity=12)
+        api_client.get('/store/products/')
+
+        response = api_client.get('/store/products/', secure=True)
+
+        assert response.data['next'].startswith('https://')
+
+    def test_if_product_is_updated_returns_fresh_data(self, api_client):
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        product.title = 'b'
+        product.save()
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.data['title'] == 'b'
+
+    def test_if_product_moves_collection_returns_fresh_lists(self, api_client):
+        product = baker.make(Product)
+        old_collection = product.collection
+        api_client.get('/store/products/', {'collection_id': old_collection.id})
+
+        product.collection = baker.make(Collection)
+        product.save()
+        response = api_client.get('/store/products/', {'collection_id': old_collection.id})
+
+        assert response.data['count'] == 0
+
+
+@pytest.mark.django_db
+class TestSearchProducts:
+    def test_if_term_matches_returns_ranked_products(self, api_client):
+        in_description = baker.make(Product, title='Bread', description='made with fresh coffee')
+        in_title = baker.make(Product, title='Coffee beans', description='')
+        baker.make(Product, title='Tea', description='')
+
+        response = api_client.get('/store/products/', {'search': 'coff'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [p['id'] for p in response.data['results']] == [in_title.id, in_description.id]
+
+    def test_if_all_terms_do_not_match_returns_nothing(self, api_client):
+        baker.make(Product, title='Coffee beans', description='')
+
+        response = api_client.get('/store/products/', {'search': 'coffee tea'})
+
+        assert response.data['count'] == 0
+
+    def test_if_other_fields_are_saved_does_not_reindex(self):
+        product = baker.make(Product, title='Coffee beans', inventory=5)
+
+        product.inventory = 4
+        with CaptureQueriesContext(connection) as context:
+            product.save(update_fields=['inventory'])
+
+        assert not any('store_productsearchterm' in query['sql'] for query in context.captured_queries)
+
+    def test_if_title_is_saved_reindexes(self, api_client):
+        product = baker.make(Product, title='Coffee beans')
+
+        product.title = 'Tea leaves'
+        product.save(update_fields=['title'])
+        response = api_client.get('/store/products/', {'search': 'tea'})
+
+        assert [p['id'] for p in response.data['results']] == [product.id]
+
+
+@pytest.mark.django_db
+class TestConditionalRetrieveProduct:
+    def test_if_etag_matches_returns_304_without_queries(self, api_client, django_assert_num_queries):
+        product = baker.make(Product)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        with django_assert_num_queries(0):
+            response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+    def test_if_product_is_updated_returns_200(self, api_client):
+        product = baker.make(Product)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        product.save()
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_not_modified_since_returns_304(self, api_client):
+        product = baker.make(Product)
+        last_modified = api_client.get(f'/store/products/{product.id}/')['Last-Modified']
+
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_image_is_added_returns_200(self, api_client):
+        product = baker.make(Product)
+        # Last-Modified has a resolution of one second.
+        Product.objects.update(last_update=timezone.now() - timedelta(minutes=1))
+        last_modified = api_client.get(f'/store/products/{product.id}/')['Last-Modified']
+
+        baker.make(ProductImage, product=product, image='store/images/a.jpg')
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['images']) == 1
+        assert response['Last-Modified'] != last_modified
+
+    def test_if_derivatives_are_generated_touches_product(self):
+        product = baker.make(Product)
+        image = baker.make(ProductImage, product=product, image='store/images/a.jpg')
+        Product.objects.update(last_update=timezone.now() - timedelta(minutes=1))
+
+        image.derivatives = {'thumb': 'store/images/a-thumb.jpg'}
+        image.save(update_fields=['derivatives'])
+
+        product.refresh_from_db()
+        assert product.last_update > timezone.now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+class TestFastListSerialization:
+    def test_if_compiled_returns_same_json_as_serializer(self):
+        products = baker.make(Product, description=None, unit_price=Decimal('12.30'), _quantity=2)
+        baker.make(Product, description='a', unit_price=Decimal('7.00'))
+        baker.make(ProductImage, product=products[0], image='store/images/a.jpg', _quantity=2)
+        request = Request(APIRequestFactory().get('/store/products/'))
+        queryset = Product.objects.prefetch_related('images').order_by('id')
+        compiled = compile_serializer(ProductSerializer)
+
+        expected = ProductSerializer(queryset, many=True, context={'request': request}).data
+        actual = compiled.to_representation(compiled.values(queryset), {'request': request})
+
+        assert JSONRenderer().render(actual) == JSONRenderer().render(expected)
+
+    def test_if_collections_are_listed_returns_same_json_as_serializer(self, api_client):
+        baker.make(Collection, _quantity=3)
+
+        response = api_client.get('/store/collections/')
+
+        expected = CollectionSerializer(Collection.objects.all(), many=True).data
+        assert response.content == JSONRenderer().render(expected)
+
+
+@pytest.mark.django_db
+class TestProductPriceWithTax:
+    def test_if_product_is_saved_stores_rounded_price(self, settings):
+        settings.STORE_TAX_RATE = Decimal('0.10')
+        product = baker.make(Product, unit_price=Decimal('10.05'))
+
+        product.refresh_from_db()
+
+        assert product.price_with_tax == Decimal('11.06')
+
+    def test_if_unit_price_is_updated_recomputes_price(self):
+        product = baker.make(Product, unit_price=Decimal('10.00'))
+
+        product.unit_price = Decimal('20.00')
+        product.save(update_fields=['unit_price'])
+        product.refresh_from_db()
+
+        assert product.price_with_tax == Decimal('22.00')
+
+    def test_if_rate_changes_recompute_matches_save(self, settings):
+        products = baker.make(Product, unit_price=Decimal('10.05'), _quantity=2)
+        settings.STORE_TAX_RATE = Decimal('0.20')
+
+        call_command('recompute_price_with_tax')
+
+        assert set(Product.objects.values_list('price_with_tax', flat=True)) == {Decimal('12.06')}
+        products[0].save()
+        products[0].refresh_from_db()
+        assert products[0].price_with_tax == Decimal('12.06')
+
+    def test_if_filtered_and_ordered_by_price_with_tax_returns_products(self, api_client):
+        baker.make(Product, unit_price=Decimal('5.00'))
+        middle = baker.make(Product, unit_price=Decimal('10.00'))
+        top = baker.make(Product, unit_price=Decimal('20.00'))
+
+        response = api_client.get('/store/products/', {
+            'price_with_tax__gt': '6', 'ordering': '-price_with_tax'})
+
+        assert [p['id'] for p in response.data['results']] == [top.id, middle.id]
+        assert response.data['results'][0]['price_with_tax'] == Decimal('22.00')
+
+
+@pytest.mark.django_db
+class TestExportProducts:
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get('/store/products/export/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_ndjson_is_requested_streams_every_product(self, api_client, authenticate, monkeypatch):
+        monkeypatch.setattr('store.export.CHUNK_SIZE', 2)
+        products = baker.make(Product, _quantity=5)
+        baker.make(ProductImage, product=products[0], image='store/images/a.jpg')
+        authenticate(is_staff=True)
+
+        response = api_client.get('/store/products/export/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert [line['id'] for line in lines] == sorted(p.id for p in products)
+        assert lines[0]['collection_title'] == products[0].collection.title
+        assert lines[0]['images'][0]['image'].endswith('/media/store/images/a.jpg')
+
+    def test_if_csv_is_requested_streams_header_and_rows(self, api_client, authenticate):
+        baker.make(Product, _quantity=3)
+        authenticate(is_staff=True)
+
+        response = api_client.get('/store/products/export/', {'output': 'csv'})
+
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        assert response['Content-Type'] == 'text/csv'
+        assert rows[0][0] == 'id'
+        assert len(rows) == 4
+
+    def test_if_since_is_given_streams_updated_products(self, api_client, authenticate):
+        old = baker.make(Product)
+        Product.objects.filter(pk=old.pk).update(last_update='2020-01-01T00:00:00Z')
+        new = baker.make(Product)
+        authenticate(is_staff=True)
+
+        response = api_client.get('/store/products/export/', {'since': '2021-01-01T00:00:00Z'})
+
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert [line['id'] for line in lines] == [new.id]
+
+    def test_if_since_is_invalid_returns_400(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = api_client.get('/store/products/export/', {'since': 'yesterday'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestImportProducts:
+    def post_ndjson(self, api_client, rows):
+        body = '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+        return api_client.post('/store/products/import/', body, content_type='application/x-ndjson')
+
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = self.post_ndjson(api_client, [])
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_rows_are_valid_upserts_products(self, api_client, authenticate):
+        collection = baker.make(Collection)
+        product = baker.make(Product, collection=collection, title='old')
+        row = {'title': 'Blue kettle', 'slug': 'blue-kettle', 'inventory': 3,
+               'unit_price': '10.00', 'collection': collection.id}
+        authenticate(is_staff=True)
+
+        response = self.post_ndjson(api_client, [{**row, 'id': product.id}, row])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['imported_count'] == 2
+        product.refresh_from_db()
+        assert product.title == 'Blue kettle'
+        assert product.price_with_tax == Decimal('11.00')
+        collection.refresh_from_db()
+        assert collection.products_count == 2
+        search = api_client.get('/store/products/', {'search': 'kettle'})
+        assert search.data['count'] == 2
+
+    def test_if_rows_are_invalid_reports_row_errors(self, api_client, authenticate):
+        collection = baker.make(Collection)
+        valid = {'title': 'a', 'slug': 'a', 'inventory': 1, 'unit_price': '5', 'collection': collection.id}
+        authenticate(is_staff=True)
+
+        response = self.post_ndjson(api_client, [
+            valid, {**valid, 'collection': collection.id + 1}, '{not json', {**valid, 'unit_price': '0'}])
+
+        assert response.data['imported_count'] == 1
+        assert response.data['error_count'] == 3
+        assert [error['row'] for error in response.data['errors']] == [2, 3, 4]
+        assert 'collection' in response.data['errors'][0]['errors']
+        assert 'unit_price' in response.data['errors'][2]['errors']
+
+    def test_if_line_is_not_utf8_reports_row_error(self, api_client, authenticate):
+        collection = baker.make(Collection)
+        row = {'title': 'Blue kettle', 'slug': 'blue-kettle', 'inventory': 3,
+               'unit_price': '10.00', 'collection': collection.id}
+        authenticate(is_staff=True)
+
+        response = api_client.post('/store/products/import/', json.dumps(row).encode() + b'\n\xff\n',
+                                   content_type='application/x-ndjson')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['imported_count'], response.data['error_count']) == (1, 1)
+        assert response.data['errors'][0]['row'] == 2
+
+    def test_if_csv_is_not_utf8_refreshes_imported_chunks(self, api_client, authenticate, monkeypatch):
+        monkeypatch.setattr('store.importer.CHUNK_SIZE', 1)
+        collection = baker.make(Collection)
+        authenticate(is_staff=True)
+
+        response = api_client.post(
+            '/store/products/import/',
+            f'title,slug,inventory,unit_price,collection\nBlue kettle,blue-kettle,3,10.00,{collection.id}\n'.encode()
+            + b'\xff\n',
+            content_type='text/csv')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'Line 3' in response.data['detail']
+        collection.refresh_from_db()
+        assert collection.products_count == 1
+        search = api_client.get('/store/products/', {'search': 'kettle'})
+        assert search.data['count'] == 1
+
+    def test_if_export_is_imported_by_command_round_trips(self, api_client, authenticate, monkeypatch, tmp_path):
+        monkeypatch.setattr('store.importer.CHUNK_SIZE', 2)
+        products = baker.make(Product, unit_price=Decimal('10.00'), inventory=5, _quantity=3)
+        authenticate(is_staff=True)
+        export = api_client.get('/store/products/export/', {'output': 'csv'})
+        path = tmp_path / 'products.csv'
+        path.write_bytes(b''.join(export.streaming_content))
+        Product.objects.update(title='changed')
+
+        call_command('import_products', str(path))
+
+        assert set(Product.objects.values_list('title', flat=True)) == {p.title for p in products}
+        assert Product.objects.count() == 3
+
+
+@pytest.mark.django_db
+class TestIncludeTagsAndLikes:
+    def test_if_included_embeds_tags_and_likes_in_two_queries(self, api_client, django_assert_num_queries):
+        products = baker.make(Product, _quantity=3)
+        tag = baker.make(Tag, label='sale')
+        content_type = ContentType.objects.get_for_model(Product)
+        baker.make(TaggedItem, tag=tag, content_type=content_type, object_id=products[0].id)
+        baker.make(LikeCounter, content_type=content_type, object_id=products[0].id, count=2)
+        api_client.get('/store/products/')
+
+        # cached page, then one query per include
+        with django_assert_num_queries(2):
+            response = api_client.get('/store/products/', {'include': 'tags,likes'})
+
+        results = {p['id']: p for p in response.data['results']}
+        assert results[products[0].id]['tags'] == ['sale']
+        assert results[products[0].id]['likes_count'] == 2
+        assert results[products[1].id]['tags'] == []
+        assert results[products[1].id]['likes_count'] == 0
+        assert 'ETag' not in response
+
+    def test_if_not_included_returns_products_only(self, api_client):
+        baker.make(Product)
+
+        response = api_client.get('/store/products/')
+
+        assert 'tags' not in response.data['results'][0]
+
+    def test_if_tag_is_added_embeds_it_without_invalidation(self, api_client):
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/', {'include': 'tags'})
+
+        baker.make(TaggedItem, tag__label='new', content_object=product)
+        response = api_client.get(f'/store/products/{product.id}/', {'include': 'tags'})
+
+        assert response.data['tags'] == ['new']
+
+    def test_if_include_is_unknown_returns_400(self, api_client):
+        response = api_client.get('/store/products/', {'include': 'reviews'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,23 @@
+from django.core.management import call_command
+from model_bakery import baker
+from store.management.commands.check_query_plans import uses_index
+from store.models import Product
+import pytest
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    def test_if_indexes_exist_every_query_uses_its_index(self):
+        baker.make(Product, _quantity=20)
+
+        call_command('check_query_plans')
+
+    def test_if_other_index_is_used_returns_false(self):
+        expected = {'product_collection_title_idx'}
+
+        assert not uses_index('Seq Scan on store_product  (cost=0.00..22.00 rows=1)', expected)
+        assert not uses_index(
+            'Index Scan using store_product_collection_id_2914d2ba on store_product', expected)
+        assert uses_index(
+            '2 0 0 SEARCH store_product USING INDEX product_collection_title_idx (collection_id=?)',
+            expected)
@@ -0,0 +1,36 @@
+import hashlib
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from .validators import MAX_FILE_SIZE_KB
+
+
+class LimitedHashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams an upload to a temporary file, which FileSystemStorage then
+    moves into place instead of copying. The upload is aborted as soon as
+    it crosses `max_size`, and its sha256 is computed on the way through
+    and exposed as `content_hash` on the uploaded file.
+    """
+    max_size = MAX_FILE_SIZE_KB * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.exceeded = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.content_hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.exceeded = True
+            # Stop reading the body instead of draining the rest of it.
+            raise StopUpload(connection_reset=True)
+        self.content_hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.content_hash.hexdigest()
+        return file
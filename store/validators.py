@@ -1,7 +1,12 @@
 from django.core.exceptions import ValidationError
 
-def validate_file_size(file):
-    max_size_kb = 500
+MAX_FILE_SIZE_KB = 500
+
+
+def get_file_size_error():
+    return f'Files cannot be larger than {MAX_FILE_SIZE_KB}KB!'
 
-    if file.size > max_size_kb * 1024:
-        raise ValidationError(f'Files cannot be larger than {max_size_kb}KB!')
\ No newline at end of file
+
+def validate_file_size(file):
+    if file.size > MAX_FILE_SIZE_KB * 1024:
+        raise ValidationError(get_file_size_error())
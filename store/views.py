@@ -1,20 +1,32 @@
+from uuid import UUID
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models.aggregates import Count
+from django.db.models.aggregates import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.mixins import CreateModelMixin, UpdateModelMixin , RetrieveModelMixin, DestroyModelMixin
 from rest_framework.decorators import action
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import  DjangoModelPermissions, IsAuthenticated , AllowAny, IsAdminUser
+from likes.models import LikedItem
 
 
+from store import cache, embeds, export, importer
+from store.conditional import ConditionalGetMixin
+from store.fastpath import FastListMixin
 from store.permissions import IsAdminOrReadOnly , ViewCustomerHistoryPermission
+from store.uploads import LimitedHashingUploadHandler
+from store.validators import get_file_size_error
 from .filters import ProductFilter
-from .pagination import DefaultPagination
+from .pagination import DefaultPagination, KeysetPagination
+from .search import ProductSearchFilter
 from .models import Cart, CartItem, Collection, Customer, Order, Product, OrderItem, ProductImage, Review
-from .serializers import AddCartItemSerializer, ProductImageSerializer, UpdateOrderSerializer , CartItemSerializer, CartSerializer, CollectionSerializer, CreateOrderSerializer, CustomerSerializer, OrderSerializer, ProductSerializer, ReviewSerializer, UpdateCartItemSerializer
+from .serializers import AddCartItemSerializer, AddCartItemsSerializer, ProductImageSerializer, UpdateOrderSerializer , CartItemSerializer, CartSerializer, CollectionSerializer, CreateOrderSerializer, CustomerSerializer, OrderSerializer, ProductSerializer, ReviewSerializer, UpdateCartItemSerializer
 from . import serializers
 
 
@@ -28,19 +40,71 @@ from . import serializers
 # ------- and [ProductDetail] in a single viewset called [ ProductViewSet ] --
 # ------------- since they have multiple similar lines of code ---------------
 # ----------------------------------------------------------------------------
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, FastListMixin, ModelViewSet):
     queryset = Product.objects.prefetch_related('images').all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
     pagination_class = DefaultPagination
     permission_classes = [IsAdminOrReadOnly]
     search_fields = ['title', 'description']
-    ordering_fields = ['unit_price', 'last_update']
+    ordering_fields = ['unit_price', 'price_with_tax', 'last_update']
 
     def get_serializer_context(self):
         return {'request': self.request}
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.is_requested(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        key = cache.product_list_key(request)
+        includes = embeds.get_includes(request)
+        if not includes:
+            return self.conditional_response(
+                key, self.cached_response, key, super().list, request, *args, **kwargs)
+        # Tags and likes do not bump the catalog versions, so the ETag
+        # cannot vouch for them.
+        response = self.cached_response(key, super().list, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            data = response.data
+            embeds.embed(data['results'] if 'results' in data else data, includes)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        key = cache.product_detail_key(request, kwargs['pk'])
+        includes = embeds.get_includes(request)
+        if not includes:
+            return self.conditional_response(
+                key, self.cached_response, key, self.retrieve_product, request, *args, **kwargs)
+        response = self.cached_response(key, self.retrieve_product, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            embeds.embed([response.data], includes)
+        return response
+
+    def retrieve_product(self, request, *args, **kwargs):
+        product = self.get_object()
+        serializer = self.get_serializer(product)
+        # Image changes touch last_update too, so it covers the whole response.
+        return Response(serializer.data, headers={
+            'Last-Modified': http_date(product.last_update.timestamp())
+        })
+
+    def cached_response(self, key, handler, request, *args, **kwargs):
+        cached = cache.get_data(key)
+        if cached is not None:
+            data, headers = cached
+            return Response(data, headers=headers)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {name: response[name] for name in ['Last-Modified'] if name in response}
+            cache.set_data(key, (response.data, headers))
+        return response
 
     def destroy(self, request, *args, **kwargs):
         if OrderItem.objects.filter(product_id=kwargs['pk']).count() > 0:
@@ -48,6 +112,43 @@ class ProductViewSet(ModelViewSet):
                 status=status.HTTP_405_METHOD_NOT_ALLOWED)
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=True, methods=['POST', 'DELETE'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk):
+        product = get_object_or_404(Product.objects.only('id'), pk=pk)
+        if request.method == 'DELETE':
+            LikedItem.objects.unlike(request.user, product)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        created = LikedItem.objects.like(request.user, product)
+        return Response(status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request):
+        # `format` is taken by DRF's content negotiation.
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.FORMATS:
+            raise ValidationError({'output': f'Must be one of: {", ".join(export.FORMATS)}.'})
+        queryset = Product.objects.order_by('id')
+        if 'since' in request.query_params:
+            since = parse_datetime(request.query_params['since'])
+            if since is None:
+                raise ValidationError({'since': 'Must be an ISO 8601 datetime.'})
+            queryset = queryset.filter(last_update__gte=since)
+
+        encode, content_type = export.FORMATS[output]
+        products = export.export_products(queryset, self.get_serializer_context())
+        return StreamingHttpResponse(encode(products), content_type=content_type, headers={
+            'Content-Disposition': f'attachment; filename="products.{output}"'
+        })
+
+    @action(detail=False, methods=['POST'], permission_classes=[IsAdminUser], url_path='import')
+    def import_products(self, request):
+        # The body is read as a stream instead of through request.data so
+        # a large file is never held in memory.
+        input_format = 'csv' if request.content_type.startswith('text/csv') else 'ndjson'
+        lines = request.stream or []
+        result = importer.import_products(importer.READERS[input_format](lines))
+        return Response(result.data)
+
 
 
 
@@ -118,12 +219,19 @@ class ProductViewSet(ModelViewSet):
 #         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(
-            products_count=Count('products')).all()
+class CollectionViewSet(ConditionalGetMixin, FastListMixin, ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    def list(self, request, *args, **kwargs):
+        key = cache.collection_list_key(request)
+        return self.conditional_response(key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = cache.collection_detail_key(request, kwargs['pk'])
+        return self.conditional_response(key, super().retrieve, request, *args, **kwargs)
+
     def destroy(self, request, *args, **kwargs):
         collection = get_object_or_404(Collection, pk=kwargs['pk'])
         if collection.products.count() > 0:
@@ -144,17 +252,31 @@ class ReviewViewSet(ModelViewSet):
         return {'product_id': self.kwargs['product_pk']}
 
 
-class CartViewSet(CreateModelMixin, RetrieveModelMixin,
+class CartViewSet(ConditionalGetMixin, CreateModelMixin, RetrieveModelMixin,
                  DestroyModelMixin, GenericViewSet):
-    queryset = Cart.objects.prefetch_related('items__product').all()
+    queryset = Cart.objects.with_total_price()
     serializer_class = CartSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            cart_id = UUID(kwargs['pk'])
+        except ValueError:
+            cart_id = None
+        key = None
+        if cart_id is not None:
+            products_updated_at = CartItem.objects.filter(cart_id=cart_id)\
+                .aggregate(updated_at=Max('product__last_update'))['updated_at']
+            key = cache.cart_key(request, cart_id, products_updated_at)
+        return self.conditional_response(key, super().retrieve, request, *args, **kwargs)
+
 
 class CartItemViewSet(ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_serializer_class(self):
-        if self.request.method == 'POST':
+        if self.action == 'bulk':
+            return AddCartItemsSerializer
+        elif self.request.method == 'POST':
             return AddCartItemSerializer
         elif self.request.method == 'PATCH':
             return UpdateCartItemSerializer
@@ -163,9 +285,17 @@ class CartItemViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {'cart_id': self.kwargs['cart_pk']}
 
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request, cart_pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_items = serializer.save()
+        serializer = CartItemSerializer(cart_items, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def get_queryset(self):
-        return CartItem.objects\
-            .select_related('product').filter(cart_id=self.kwargs['cart_pk'])
+        return CartItem.objects.with_total_price()\
+            .filter(cart_id=self.kwargs['cart_pk'])
 
 
 class CustomerViewSet(ModelViewSet):
@@ -179,7 +309,7 @@ class CustomerViewSet(ModelViewSet):
 
     @action(detail=False, methods=['GET', 'PUT'], permission_classes = [IsAuthenticated])
     def me(self, request):
-        customer = Customer.objects.get(user_id = request.user.id)
+        customer = request.customer
         if request.method == 'GET':
             serializer = CustomerSerializer(customer)
             return Response(serializer.data)
@@ -192,6 +322,7 @@ class CustomerViewSet(ModelViewSet):
         
 class OrderViewSet(ModelViewSet):
     http_method_names = ['get', 'post' ,'patch', 'delete', 'head', 'options']
+    pagination_class = DefaultPagination
 
     def get_permissions(self):
         if self.request.method in ['PATCH','DELETE']:
@@ -201,9 +332,10 @@ class OrderViewSet(ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = CreateOrderSerializer(
                 data=request.data,
-                context = {'user_id' : self.request.user.id})
+                context = {'customer_id' : self.get_customer_id()})
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
+        order = self.get_queryset().get(pk=order.pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data) 
 
@@ -215,21 +347,60 @@ class OrderViewSet(ModelViewSet):
             return UpdateOrderSerializer
         return OrderSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs['fields'] = self.get_requested_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_requested_fields(self):
+        # Sparse fieldsets, e.g. ?fields=id,placed_at,order_total_price
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',')]
+
     # def get_serializer_context(self):
     #     return {'user_id' : self.request.user.id}
 
     def get_queryset(self):
+        queryset = Order.objects.with_total_price().order_by('-placed_at', '-id')
+        fields = self.get_requested_fields()
+        if fields is None or 'items' in fields:
+            queryset = queryset.with_items()
+
         user = self.request.user
         if user.is_staff:
-            return Order.objects.prefetch_related('items__product').all()
+            return queryset
         
-        customer_id = Customer.objects.only('id').get(user_id = user.id)
-        return Order.objects.prefetch_related('items__product').filter(customer_id = customer_id)
+        return queryset.filter(customer_id = self.get_customer_id())
+
+    def get_customer_id(self):
+        # A stateless JWT user carries its customer id.
+        return getattr(self.request.user, 'customer_id', None) or \
+            self.request.customer.id
     
 
 class ProductImageViewSet(ModelViewSet):
     serializer_class = ProductImageSerializer
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Must be set before the body is parsed.
+        request.upload_handlers = [LimitedHashingUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        self.check_upload_size(request)
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        self.check_upload_size(request)
+        return super().update(request, *args, **kwargs)
+
+    def check_upload_size(self, request):
+        request.data # parses the body
+        if any(getattr(handler, 'exceeded', False) for handler in request.upload_handlers):
+            raise ValidationError({'image': [get_file_size_error()]})
+
     def get_serializer_context(self):
         return {'product_id': self.kwargs['product_pk']}
     
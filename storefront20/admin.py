@@ -0,0 +1,21 @@
+from django.db.models import Q
+
+
+class PrefixSearchMixin:
+    """
+    For `ModelAdmin`s whose `search_fields` are `istartswith` lookups.
+
+    Django splits the search term into words and requires each word to
+    match, so "Coffee beans" looks for titles starting with both "Coffee"
+    and "beans" and finds nothing. A term of several words also matches
+    when the whole of it is a prefix of one of the fields.
+    """
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        search_term = search_term.strip()
+        if len(search_term.split()) > 1:
+            whole_term = Q()
+            for field in self.get_search_fields(request):
+                whole_term |= Q(**{field: search_term})
+            results |= queryset.filter(whole_term)
+        return results, may_have_duplicates
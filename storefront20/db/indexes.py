@@ -0,0 +1,27 @@
+"""
+Migration operations for indexes that only PostgreSQL supports.
+"""
+from django.db import migrations
+
+
+def prefix_search_index(name, table, column):
+    """
+    An index on UPPER(column) with text_pattern_ops. It serves the
+    `UPPER(column::text) LIKE UPPER('prefix%')` queries that `istartswith`
+    lookups compile to, as used by the admin search boxes. It is skipped on
+    other databases.
+    """
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        quote_name = schema_editor.quote_name
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote_name(name)} ON {quote_name(table)} '
+            f'(UPPER({quote_name(column)}::text) text_pattern_ops)')
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+    return migrations.RunPython(create, drop)
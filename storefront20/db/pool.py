@@ -0,0 +1,127 @@
+"""
+A small in-process connection pool and per-worker connection metrics,
+used by the pooled_postgresql backend.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Hands out at most `max_size` connections. Idle connections are reused
+    last-in first-out, and one that sat idle for more than `check_after`
+    seconds must pass `is_usable` before it is handed out again.
+    """
+    def __init__(self, connect, is_usable, max_size=10, timeout=10, check_after=30):
+        self.connect = connect
+        self.is_usable = is_usable
+        self.timeout = timeout
+        self.check_after = check_after
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def get(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f'No database connection was released within {self.timeout}s.')
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, released_at = self._idle.pop()
+                if self._check(connection, released_at):
+                    return connection
+                self._discard(connection)
+            return self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection, discard=False):
+        try:
+            if discard or connection.closed:
+                self._discard(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _check(self, connection, released_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            return self.is_usable(connection)
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class ConnectionMetrics:
+    """
+    Connection acquisition times of this worker process. A summary is
+    logged every `log_every` acquisitions.
+    """
+    def __init__(self, sample_size=1000, log_every=1000):
+        self.log_every = log_every
+        self.count = 0
+        self.samples = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.samples.append(seconds)
+            log = self.count % self.log_every == 0
+        if log:
+            logger.info('Database connections of pid %(pid)s: %(count)s acquired, '
+                        'p50 %(p50).2fms, p99 %(p99).2fms, max %(max).2fms', self.snapshot())
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            count = self.count
+
+        def percentile(fraction):
+            if not samples:
+                return 0
+            return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+        return {
+            'pid': os.getpid(),
+            'count': count,
+            'p50': percentile(0.5),
+            'p99': percentile(0.99),
+            'max': samples[-1] * 1000 if samples else 0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.samples.clear()
+
+
+metrics = ConnectionMetrics()
@@ -0,0 +1,71 @@
+"""
+The PostgreSQL backend with connection acquisition metrics and an
+optional in-process pool, enabled with OPTIONS['POOL']:
+
+    'OPTIONS': {'POOL': {'max_size': 10, 'timeout': 10, 'check_after': 30}}
+
+With a pool, CONN_MAX_AGE should be 0: closing the connection at the end
+of a request returns it to the pool, where other threads can reuse it.
+"""
+import os
+import threading
+import time
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import IsolationLevel
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from ..pool import ConnectionPool, metrics
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('POOL', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        pool_options = self.settings_dict['OPTIONS'].get('POOL')
+        if pool_options is None:
+            connection = super().get_new_connection(conn_params)
+        else:
+            self._pool = self.get_pool(conn_params, pool_options)
+            connection = self._pool.get()
+            # Set by the parent's get_new_connection() for new connections.
+            self.isolation_level = IsolationLevel(self.settings_dict['OPTIONS'].get(
+                'isolation_level', IsolationLevel.READ_COMMITTED))
+        metrics.record(time.perf_counter() - start)
+        return connection
+
+    def get_pool(self, conn_params, pool_options):
+        # Pools are per process: a forked worker must not share sockets
+        # with its parent.
+        key = (self.alias, os.getpid())
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = ConnectionPool(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                    self.is_connection_usable,
+                    **pool_options)
+            return _pools[key]
+
+    def is_connection_usable(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+
+    def _close(self):
+        if self.connection is None or self._pool is None:
+            return super()._close()
+        pool, self._pool = self._pool, None
+        discard = False
+        try:
+            if self.connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                self.connection.rollback()
+        except Exception:
+            discard = True
+        pool.put(self.connection, discard=discard)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+from decimal import Decimal
 from pathlib import Path
 from datetime import timedelta
 from celery.schedules import crontab
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'store.customers.CustomerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
@@ -145,7 +147,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING' : False,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.StatelessJWTAuthentication',
         ),
     # 'DEFAULT_PERMISSION_CLASSES' : [
     #     'rest_framework.permissions.IsAuthenticated'
@@ -153,11 +155,22 @@ REST_FRAMEWORK = {
 }
 
 AUTH_USER_MODEL = 'core.User'
+AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+
+STORE_RESPONSE_CACHE_TIMEOUT = 10 * 60
+STORE_CUSTOMER_CACHE_TIMEOUT = 60
+STORE_SEARCH_BACKEND = 'store.search.InvertedIndexSearchBackend'
+# Run recompute_price_with_tax after changing the rate.
+STORE_TAX_RATE = Decimal('0.10')
+# Run store signal receivers in Celery after the transaction commits.
+STORE_ASYNC_SIGNALS = True
 
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('JWT',),
    "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "core.serializers.TokenRefreshSerializer",
 }
 
 
@@ -184,7 +197,11 @@ CELERY_BEAT_SCHEDULE = {
         'schedule' : 5,
         'args' : ['Hello every 5 sec'], 
         #'schedule' : crontab(day_of_week=1, hour=7, minute=30)
-    }
+    },
+    'flush_like_counters' : {
+        'task' : 'likes.tasks.flush_like_counters',
+        'schedule' : 10,
+    },
 }
 
 LOGGING = {
@@ -8,3 +8,38 @@ DEBUG = False
 ALLOWED_HOSTS = []
 
 SECRET_KEY = os.environ('SECRET_KEY')
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'storefront20.db.pooled_postgresql',
+        'NAME': os.environ.get('DB_NAME', 'storefront'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Reuse a worker's connection for this many seconds, checking it
+        # is still usable at the start of each request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+}
+
+# DB_POOL_SIZE enables the in-process pool, useful with threaded workers.
+# Pooled connections are returned at the end of each request instead of
+# being kept by the thread.
+if os.environ.get('DB_POOL_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['POOL'] = {
+        'max_size': int(os.environ['DB_POOL_SIZE']),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+# Response versions and like counters must be shared by every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/2'),
+    }
+}
@@ -0,0 +1,34 @@
+import time
+from django.core.cache import cache
+
+
+class VersionCounters:
+    """
+    Version counters kept in the shared cache under `<prefix>:<name>`.
+    Anything keyed on a version is invalidated by bumping it.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def key(self, name):
+        return f'{self.prefix}:{name}'
+
+    def get(self, *names):
+        keys = [self.key(name) for name in names]
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Seed with a timestamp rather than 1 so that an evicted
+                # counter can never come back at a value something was
+                # already keyed on.
+                cache.add(key, time.time_ns(), None)
+                versions[key] = cache.get(key)
+        return [versions[key] for key in keys]
+
+    def bump(self, *names):
+        for name in names:
+            key = self.key(name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), None)
@@ -1,10 +1,11 @@
 from django.contrib import admin
+from storefront20.admin import PrefixSearchMixin
 from .models import Tag
 
 # Register your models here.
 
 #@admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
-    search_fields = ['label']
+class TagAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    search_fields = ['label__istartswith']
 
 admin.site.register(Tag, TagAdmin)
@@ -0,0 +1,13 @@
+from django.db import migrations
+from storefront20.db.indexes import prefix_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0002_query_indexes'),
+    ]
+
+    operations = [
+        prefix_search_index('tag_label_prefix_idx', 'tags_tag', 'label'),
+    ]
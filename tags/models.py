@@ -1,3 +1,4 @@
+from collections import defaultdict
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -12,6 +13,18 @@ class TaggedItemManager(models.Manager):
                 object_id = obj_id
         )
 
+    def get_tags_for_many(self, obj_type, obj_ids):
+        """Returns {object id: [Tag, ...]} for all `obj_ids` in one query."""
+        content_type = ContentType.objects.get_for_model(obj_type)
+        tags = defaultdict(list)
+        tagged_items = TaggedItem.objects.select_related('tag').filter(
+                content_type=content_type,
+                object_id__in=obj_ids
+        )
+        for tagged_item in tagged_items:
+            tags[tagged_item.object_id].append(tagged_item.tag)
+        return tags
+
 class Tag(models.Model):
     label = models.CharField(max_length = 255)
 
@@ -28,5 +41,10 @@ class TaggedItem(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='taggeditem_object_idx'),
+        ]
+
 
 